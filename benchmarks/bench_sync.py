@@ -0,0 +1,205 @@
+"""End-to-end sync benchmark for the energiinfo integration.
+
+Runs the account coordinator against the fake API for N meters x M days and
+times the fetch (`EnergiinfoCoordinator.async_refresh`) and the processing
+(`async_update_historical` + `async_calculate_statistic_data`) of every meter.
+The first run starts with an empty reading cache, later runs reuse it.
+
+    python -m benchmarks.bench_sync --meters 10 --days 365 --latency 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.energiinfo.const import (
+    DOMAIN,
+    CONF_URL,
+    CONF_SITEID,
+    CONF_STORED_TOKEN,
+    CONF_BACKFILL_PARALLELISM,
+)
+from custom_components.energiinfo.coordinator import EnergiinfoCoordinator
+from custom_components.energiinfo.sensor import EnergiinfoHistorySensor
+from custom_components.energiinfo.store import async_get_sync_store
+
+from .fake_api import FakeApiOptions, FakeEnergiinfoApi, async_start_fake_api
+
+
+@dataclass
+class RunResult:
+    """Measurements of one benchmark run."""
+
+    run: int
+    meters: int
+    days: int
+    hours: int
+    fetch_seconds: float
+    process_seconds: float
+    api_calls: dict[str, int]
+
+    @property
+    def wall_seconds(self) -> float:
+        return self.fetch_seconds + self.process_seconds
+
+    @property
+    def hours_per_second(self) -> float:
+        return self.hours / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def calls_per_meter_day(self) -> float:
+        return sum(self.api_calls.values()) / (self.meters * self.days)
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "wall_seconds": self.wall_seconds,
+            "hours_per_second": self.hours_per_second,
+            "calls_per_meter_day": self.calls_per_meter_day,
+        }
+
+
+async def async_start_hass(config_dir: str) -> HomeAssistant:
+    """Start a Home Assistant instance with an in-memory recorder."""
+    os.makedirs(os.path.join(config_dir, ".storage"), exist_ok=True)
+    hass = HomeAssistant(config_dir)
+    await hass.config.async_set_time_zone("Europe/Stockholm")
+    await async_setup_component(
+        hass, "recorder", {"recorder": {"db_url": "sqlite://"}}
+    )
+    await hass.async_start()
+    await hass.async_block_till_done()
+    hass.data.setdefault(DOMAIN, {})
+    return hass
+
+
+async def async_run(
+    hass: HomeAssistant, api: FakeEnergiinfoApi, url: str, args, run: int
+) -> RunResult:
+    """Sync every meter of the fake account once from scratch."""
+    entry = SimpleNamespace(
+        entry_id=f"bench-{run}",
+        title=f"bench {run}",
+        data={
+            CONF_URL: url,
+            CONF_SITEID: "1",
+            CONF_USERNAME: "bench",
+            CONF_PASSWORD: "bench",
+            CONF_STORED_TOKEN: None,
+            CONF_BACKFILL_PARALLELISM: args.parallelism,
+        },
+    )
+    coordinator = EnergiinfoCoordinator(hass, entry, await async_get_sync_store(hass))
+    coordinator.async_add_entry(entry)
+
+    sensors = []
+    for meter_id in api.meter_ids:
+        sensor = EnergiinfoHistorySensor(
+            coordinator, meter_id, meter_id, args.days, None, hourly_days=args.hourly_days
+        )
+        sensor.hass = hass
+        sensor.entity_id = f"sensor.{DOMAIN}_bench_{run}_{meter_id}"
+        # A new entity has no statistics to resume from
+        sensor._resumed = True
+        coordinator.async_register_meter(meter_id, sensor._async_next_request)
+        sensors.append(sensor)
+
+    api.reset_counters()
+    started = time.perf_counter()
+    await coordinator.async_refresh()
+    fetched = time.perf_counter()
+
+    hours = 0
+    for sensor in sensors:
+        await sensor.async_update_historical()
+        await sensor.async_calculate_statistic_data(
+            sensor.historical_states, latest=None
+        )
+        # Backfills are bulk imported, historical_states only holds the tail
+        hours += sum(end - start for start, end in sensor._covered)
+    processed = time.perf_counter()
+
+    return RunResult(
+        run=run,
+        meters=len(sensors),
+        days=args.days,
+        hours=hours,
+        fetch_seconds=fetched - started,
+        process_seconds=processed - fetched,
+        api_calls=dict(api.calls),
+    )
+
+
+def print_results(results: list[RunResult]) -> None:
+    print(
+        f"{'run':>3} {'meters':>6} {'days':>5} {'hours':>8} {'fetch s':>8} "
+        f"{'process s':>9} {'hours/s':>9} {'calls/meter-day':>15}  calls"
+    )
+    for result in results:
+        print(
+            f"{result.run:>3} {result.meters:>6} {result.days:>5} {result.hours:>8} "
+            f"{result.fetch_seconds:>8.3f} {result.process_seconds:>9.3f} "
+            f"{result.hours_per_second:>9.0f} {result.calls_per_meter_day:>15.4f}  "
+            f"{result.api_calls}"
+        )
+
+
+async def async_main(args) -> list[RunResult]:
+    api = FakeEnergiinfoApi(
+        FakeApiOptions(
+            meters=args.meters,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            publication_lag=args.publication_lag,
+        )
+    )
+    runner, url = await async_start_fake_api(api)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            results = [
+                await async_run(hass, api, url, args, run)
+                for run in range(1, args.repeat + 1)
+            ]
+        finally:
+            await hass.async_stop()
+            await runner.cleanup()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meters", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--publication-lag", type=int, default=10)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--hourly-days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+    results = asyncio.run(async_main(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump([result.as_dict() for result in results], file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
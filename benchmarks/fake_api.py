@@ -0,0 +1,145 @@
+"""Local stand-in for the Energiinfo API used by the benchmarks.
+
+Implements the commands the integration uses (login, login/access_token,
+meteringpoints, period and logout) with configurable latency, error rate and
+publication lag, and counts the calls per command.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import itertools
+import random
+
+from aiohttp import web
+
+ACCESS_DENIED = {"status": "ERR", "error_message": "Access denied"}
+
+
+@dataclass
+class FakeApiOptions:
+    """Behaviour of the fake API."""
+
+    meters: int = 1
+    # Seconds added to every response, plus up to latency_jitter at random
+    latency: float = 0.05
+    latency_jitter: float = 0.02
+    # Share of period requests answered with an error
+    error_rate: float = 0.0
+    # Hours before now that are not published yet
+    publication_lag: int = 10
+    seed: int = 0
+
+
+@dataclass
+class FakeEnergiinfoApi:
+    """aiohttp application answering like api4.energiinfo.se."""
+
+    options: FakeApiOptions = field(default_factory=FakeApiOptions)
+    calls: Counter = field(default_factory=Counter)
+    rows: int = 0
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.options.seed)
+        self._tokens: set[str] = set()
+        self._token_ids = itertools.count(1)
+
+    @property
+    def meter_ids(self) -> list[str]:
+        return [f"7350000000000{index:05d}" for index in range(self.options.meters)]
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.rows = 0
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        return app
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        command = request.query.get("cmd", "")
+        self.calls[command] += 1
+        await asyncio.sleep(
+            self.options.latency + self._random.random() * self.options.latency_jitter
+        )
+        data = await request.post()
+        token = request.query.get("access_token")
+
+        if command == "login":
+            token = f"token-{next(self._token_ids)}"
+            self._tokens.add(token)
+            return web.json_response({"status": "OK", "access_token": token})
+        if command == "login/access_token":
+            if data.get("access_token") not in self._tokens:
+                return web.json_response(ACCESS_DENIED)
+            return web.json_response(
+                {"status": "OK", "access_token": data["access_token"]}
+            )
+        if token not in self._tokens:
+            return web.json_response(ACCESS_DENIED)
+        if command == "logout":
+            self._tokens.discard(token)
+            return web.json_response({"status": "OK"})
+        if command == "meteringpoints":
+            return web.json_response(
+                {
+                    "status": "OK",
+                    "list": [
+                        {"meteringpoint_id": meter_id, "alias": f"Meter {index}"}
+                        for index, meter_id in enumerate(self.meter_ids)
+                    ],
+                }
+            )
+        if command == "period":
+            if self._random.random() < self.options.error_rate:
+                return web.json_response(
+                    {"status": "ERR", "error_message": "Internal error"}
+                )
+            values = self._period_values(
+                data["meteringpoint_id"], data["period"], data.get("interval", "hour")
+            )
+            self.rows += len(values)
+            return web.json_response({"status": "OK", "values": values})
+        return web.json_response(
+            {"status": "ERR", "error_message": f"Unknown command {command}"}
+        )
+
+    def _period_values(self, meter_id: str, period: str, interval: str) -> list[dict]:
+        """Return one value per published hour, day or month of the period.
+
+        Both ends of the period are included, day and month values are the sum
+        of their hours.
+        """
+        start, end = (
+            datetime.strptime(part, "%Y%m%d%H") for part in period.split("-")
+        )
+        published = datetime.now().replace(
+            minute=0, second=0, microsecond=0
+        ) - timedelta(hours=self.options.publication_lag)
+        end = min(end, published)
+        seed = int(meter_id[-5:])
+        label = {"day": "%Y%m%d", "month": "%Y%m"}.get(interval, "%Y%m%d%H")
+        totals: dict[str, float] = {}
+        hour = start
+        while hour <= end:
+            value = 0.2 + ((hour.toordinal() * 24 + hour.hour + seed) % 17) / 10
+            time = hour.strftime(label)
+            totals[time] = totals.get(time, 0.0) + value
+            hour += timedelta(hours=1)
+        return [{"time": time, "value": f"{value:.3f}"} for time, value in totals.items()]
+
+
+async def async_start_fake_api(
+    api: FakeEnergiinfoApi, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """Start the fake API, return the runner and its base url."""
+    runner = web.AppRunner(api.application())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
@@ -2,56 +2,97 @@
 
 from __future__ import annotations
 
+import time
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from energiinfo.api import EnergiinfoClient
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, CONF_URL, CONF_SITEID, CONF_STORED_TOKEN
+from .cache import async_get_reading_cache
+from .const import DOMAIN, DATA_ACCOUNTS
+from .coordinator import EnergiinfoCoordinator, account_key, entry_meters, series_id
+from .quantities import QUANTITIES
+from .services import async_setup_services
+from .store import async_get_sync_store
 
 # TODO List the platforms that you want to support.
 # For your initial PR, limit it to 1 platform.
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the energiinfo services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up energiinfo from a config entry."""
+    started = time.monotonic()
     hass.data.setdefault(DOMAIN, {})
-    # TODO 1. Create API instance
-    # TODO 2. Validate the API connection (and authentication)
-    # TODO 3. Store an API object for your platforms to access
-    # hass.data[DOMAIN][entry.entry_id] = MyApi(...)
-
-    api = EnergiinfoClient(
-        config_entry.data["url"],
-        config_entry.data["site_id"],
-        config_entry.data["stored_token"],
-    )
-    # Verifies the token
-    # token = await hass.async_add_executor_job(api.get_access_token())
+    accounts: dict = hass.data[DOMAIN].setdefault(DATA_ACCOUNTS, {})
+    sync_store = await async_get_sync_store(hass)
+
+    # Entries on the same account share one coordinator, and with it one client,
+    # one token check and one poll cycle for all their meters
+    key = account_key(config_entry.data)
+    if (coordinator := accounts.get(key)) is None:
+        coordinator = accounts[key] = EnergiinfoCoordinator(
+            hass, config_entry, sync_store
+        )
+    coordinator.async_add_entry(config_entry)
 
-    hass.data[DOMAIN][config_entry.entry_id] = api
+    hass.data[DOMAIN][config_entry.entry_id] = coordinator
 
-    # if token is not None:
-    # Forward the setup to the sensor platform.
+    # Forward the setup to the sensor platform. Sensors are added from the
+    # stored state, nothing waits for the API
     hass.async_create_task(
         hass.config_entries.async_forward_entry_setup(config_entry, "sensor")
     )
+    coordinator.async_setup_done(config_entry, started)
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    api = hass.data[DOMAIN][entry.entry_id]
-    # Logout
-    response = await hass.async_add_executor_job(api.logout)
+    coordinator: EnergiinfoCoordinator = hass.data[DOMAIN][entry.entry_id]
 
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
+        # Logout once the last entry of the account is gone
+        if coordinator.async_remove_entry(entry):
+            hass.data[DOMAIN][DATA_ACCOUNTS].pop(coordinator.account_key, None)
+            await coordinator.async_logout()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the sync state and cached readings of a removed entry's meters."""
+    hass.data.setdefault(DOMAIN, {})
+    sync_store = await async_get_sync_store(hass)
+    # Meters another entry still has keep their state
+    kept = {
+        meter_id
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+        for meter_id in entry_meters(other.data)
+    }
+    keys = [
+        series_id(meter_id, quantity.signal)
+        for meter_id in entry_meters(entry.data)
+        if meter_id not in kept
+        for quantity in QUANTITIES.values()
+    ]
+    for key in keys:
+        sync_store.async_remove_meter(key)
+    await async_get_reading_cache(hass).async_remove(keys)
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     await async_unload_entry(hass, entry)
     await async_setup_entry(hass, entry)
@@ -0,0 +1,178 @@
+"""Asyncio client for the Energiinfo API."""
+
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+import json
+import time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from .governor import RequestGovernor
+    from .metrics import ApiMetrics
+
+# Commands understood by the API, see the `cmd` query parameter
+CMD_LOGIN = "login"
+CMD_LOGIN_TOKEN = "login/access_token"
+CMD_LOGOUT = "logout"
+CMD_METERPOINTS = "meteringpoints"
+CMD_PERIOD = "period"
+
+ERROR_ACCESS_DENIED = "Access denied"
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+class EnergiinfoError(Exception):
+    """Error returned by the Energiinfo API."""
+
+    def __init__(self, error_message: str | None, status: str = "ERR") -> None:
+        """Initialize the error with the status and message of the response."""
+        super().__init__(error_message)
+        self.status = status
+        self.error_message = error_message
+
+
+class EnergiinfoConnectionError(EnergiinfoError):
+    """Error to indicate the API could not be reached."""
+
+
+class EnergiinfoAuthError(EnergiinfoError):
+    """Error to indicate the API denied access."""
+
+
+class EnergiinfoApiClient:
+    """Async counterpart of `energiinfo.api.EnergiinfoClient`.
+
+    Every call returns its payload or raises an `EnergiinfoError`, there is no
+    shared status to read back afterwards, so calls can run concurrently on the
+    same client.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        api_url: str,
+        site_id: str,
+        token: str | None = None,
+        governor: RequestGovernor | None = None,
+        metrics: ApiMetrics | None = None,
+    ) -> None:
+        """Initialize the client, requests go through the governor if given."""
+        self._session = session
+        self._governor = governor
+        self._metrics = metrics
+        self.api_url = api_url.rstrip("/")
+        self.site_id = site_id
+        self.access_token = token
+
+    async def _async_post(
+        self, command: str, data: dict[str, Any] | None = None, *, token: bool = True
+    ) -> dict[str, Any]:
+        """Run a command and return the payload of a successful response."""
+        url = f"{self.api_url}/?cmd={command}"
+        if token:
+            url = f"{self.api_url}/?access_token={self.access_token}&cmd={command}"
+
+        request = partial(self._async_timed_request, command, url, data)
+        if self._governor is None:
+            return await request()
+        return await self._governor.async_call(request)
+
+    async def _async_timed_request(
+        self, command: str, url: str, data: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        """Send one request, recording its latency, size and outcome in the metrics."""
+        if self._metrics is None:
+            payload, _ = await self._async_request(url, data)
+            return payload
+        started = time.monotonic()
+        size = 0
+        ok = False
+        try:
+            payload, size = await self._async_request(url, data)
+            ok = True
+            return payload
+        finally:
+            self._metrics.record_call(command, time.monotonic() - started, ok, size)
+
+    async def _async_request(
+        self, url: str, data: dict[str, Any] | None
+    ) -> tuple[dict[str, Any], int]:
+        """Send one request, return the payload of a successful response and
+        the size of the response body.
+        """
+        try:
+            async with self._session.post(
+                url, data=data, timeout=REQUEST_TIMEOUT
+            ) as response:
+                if response.status == 500:
+                    raise EnergiinfoConnectionError("Internal server error")
+                if response.status >= 400:
+                    raise EnergiinfoError(f"Client Error: {response.status}")
+                body = await response.read()
+                payload = json.loads(body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise EnergiinfoConnectionError(f"Request Exception: {err}") from err
+        except ValueError as err:
+            raise EnergiinfoError(f"JSON Parsing Error: {err}") from err
+
+        status = payload.get("status")
+        if status != "OK":
+            error_message = payload.get("error_message")
+            if error_message == ERROR_ACCESS_DENIED:
+                raise EnergiinfoAuthError(error_message, status)
+            raise EnergiinfoError(error_message, status)
+        return payload, len(body)
+
+    async def async_authenticate(
+        self, username: str, password: str, type: str = "permanent"
+    ) -> str:
+        """Log in with username and password, return the access token."""
+        data = {
+            "site": self.site_id,
+            "Username": username,
+            "Password": password,
+            "Captcha": "",
+            "type": type,  # permanent remembers the login
+        }
+        try:
+            payload = await self._async_post(CMD_LOGIN, data)
+        except EnergiinfoConnectionError:
+            raise
+        except EnergiinfoError as err:
+            raise EnergiinfoAuthError(err.error_message, err.status) from err
+        self.access_token = payload.get("access_token")
+        return self.access_token
+
+    async def async_authenticate_token(self, token: str) -> str:
+        """Validate a stored token, return the access token to use."""
+        data = {"site": self.site_id, "access_token": token}
+        payload = await self._async_post(CMD_LOGIN_TOKEN, data, token=False)
+        self.access_token = payload.get("access_token") or token
+        return self.access_token
+
+    async def async_logout(self) -> None:
+        """Log out the current token."""
+        await self._async_post(CMD_LOGOUT)
+
+    async def async_get_metering_points(self) -> list[dict[str, Any]]:
+        """Return the metering points of the account."""
+        payload = await self._async_post(CMD_METERPOINTS)
+        return payload.get("list", [])
+
+    async def async_get_period_values(
+        self, meteringpoint_id: str, period: str, signal: str, interval: str
+    ) -> list[dict[str, Any]]:
+        """Return the values of a signal for a metering point and period."""
+        data = {
+            "meteringpoint_id": meteringpoint_id,
+            "period": period,
+            "signal": signal,
+            "interval": interval,
+        }
+        payload = await self._async_post(CMD_PERIOD, data)
+        return payload.get("values", [])
@@ -0,0 +1,123 @@
+"""Token handling for the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+import logging
+from typing import Any, TypeVar
+
+from homeassistant.util import dt as dtutil
+
+from .api import EnergiinfoApiClient, EnergiinfoAuthError
+from .const import TOKEN_VALIDITY
+from .store import EnergiinfoSyncStore
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class TokenManager:
+    """Keep a validated access token for one account.
+
+    A token validated less than TOKEN_VALIDITY ago is used without asking the
+    API again. When a call is denied access anyway, the account logs in again
+    once and the call is retried. Refreshed tokens go to the sync store instead
+    of the config entries.
+    """
+
+    def __init__(
+        self,
+        store: EnergiinfoSyncStore,
+        client: EnergiinfoApiClient,
+        account_id: str,
+        username: str,
+        password: str,
+        entry_token: str,
+    ) -> None:
+        """Initialize the manager with the token stored in the config entry."""
+        self._store = store
+        self._client = client
+        self._account_id = account_id
+        self._username = username
+        self._password = password
+        self._entry_token = entry_token
+        self._token = entry_token
+        self._validated: datetime | None = None
+        self._refreshed: datetime | None = None
+        self._lock = asyncio.Lock()
+
+        # Use the token refreshed for the current config entry token, if any
+        stored = store.account(account_id)
+        if stored.get("entry_token") == entry_token:
+            self._token = stored["token"]
+            if refreshed := stored.get("refreshed"):
+                self._refreshed = dtutil.parse_datetime(refreshed)
+
+    @property
+    def refreshed(self) -> datetime | None:
+        """Return when a new token was last issued by logging in."""
+        return self._refreshed
+
+    def update_credentials(self, password: str, entry_token: str) -> None:
+        """Use credentials from a (re)configured config entry."""
+        self._password = password
+        if entry_token != self._entry_token:
+            # The entry was authenticated again, its token wins over the stored one
+            self._entry_token = self._token = entry_token
+            self._validated = None
+
+    def invalidate(self) -> None:
+        """Force validation of the token before the next call."""
+        self._validated = None
+
+    async def async_get_token(self) -> str:
+        """Return a valid token, validating it if the validity window passed."""
+        async with self._lock:
+            if (
+                self._validated is not None
+                and dtutil.utcnow() - self._validated < TOKEN_VALIDITY
+            ):
+                return self._token
+
+            try:
+                await self._client.async_authenticate_token(self._token)
+            except EnergiinfoAuthError:
+                _LOGGER.info("Access denied. Will try login again")
+                await self._async_login()
+            else:
+                _LOGGER.debug("Token successfully verified")
+                self._validated = dtutil.utcnow()
+                self._client.access_token = self._token
+            return self._token
+
+    async def async_call(
+        self, func: Callable[..., Awaitable[_T]], *args: Any
+    ) -> _T:
+        """Call the API, log in again once and retry if access is denied."""
+        token = await self.async_get_token()
+        try:
+            return await func(*args)
+        except EnergiinfoAuthError:
+            async with self._lock:
+                # Concurrent calls denied with the same token log in only once
+                if self._token == token:
+                    _LOGGER.info("Access denied. Will try login again")
+                    await self._async_login()
+        return await func(*args)
+
+    async def _async_login(self) -> None:
+        """Log in with username and password and store the new token."""
+        self._token = await self._client.async_authenticate(
+            self._username, self._password, "permanent"
+        )
+        self._validated = self._refreshed = dtutil.utcnow()
+        self._store.async_update_account(
+            self._account_id,
+            token=self._token,
+            entry_token=self._entry_token,
+            refreshed=self._refreshed.isoformat(),
+        )
+        _LOGGER.debug(f"Refreshed token for {self._account_id}")
@@ -0,0 +1,152 @@
+"""Concurrent, chunked fetching of long periods for the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import itertools
+import logging
+
+from .api import EnergiinfoError
+from .const import CONF_MAX_DAYS_BACK
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def format_period(start: datetime, end: datetime) -> str:
+    """Format a period the way get_period_values expects it."""
+    return start.strftime("%Y%m%d%H") + "-" + end.strftime("%Y%m%d%H")
+
+
+def split_range(
+    start: datetime, end: datetime, max_days: int = CONF_MAX_DAYS_BACK
+) -> list[tuple[datetime, datetime]]:
+    """Split start..end (both inclusive hours) into periods of at most max_days."""
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=max_days), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + timedelta(hours=1)
+    return chunks
+
+
+def merge_ranges(
+    ranges: list[tuple[datetime, datetime]], max_gap: timedelta
+) -> list[tuple[datetime, datetime]]:
+    """Merge ranges (inclusive hours) separated by at most max_gap.
+
+    Fetching a few hours that are already known again is cheaper than one more
+    request.
+    """
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] <= max_gap + timedelta(hours=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _floor(dt: datetime, interval: str) -> datetime:
+    """Return the start of the day or month dt is in."""
+    dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return dt.replace(day=1) if interval == "month" else dt
+
+
+def _next(dt: datetime, interval: str) -> datetime:
+    """Return the start of the day or month after the one starting at dt."""
+    if interval == "month":
+        return dt.replace(year=dt.year + dt.month // 12, month=dt.month % 12 + 1)
+    return (dt + timedelta(days=1)).replace(hour=0)
+
+
+def split_resolution(
+    start: datetime, end: datetime, coarse: list[tuple[str, datetime]]
+) -> list[tuple[datetime, datetime, str]]:
+    """Split the local start..end (end exclusive) by the resolution to fetch.
+
+    coarse lists ("month" / "day", until) coarsest first, every whole month or
+    day before its until is fetched at that interval. What is left is "hour".
+    """
+    if start >= end:
+        return []
+    if not coarse:
+        return [(start, end, "hour")]
+    (interval, until), finer = coarse[0], coarse[1:]
+    first = _floor(start, interval)
+    if first < start:
+        first = _next(first, interval)
+    last = first
+    while (following := _next(last, interval)) <= min(end, until):
+        last = following
+    if first >= last:
+        return split_resolution(start, end, finer)
+    return [
+        *split_resolution(start, first, finer),
+        (first, last, interval),
+        *split_resolution(last, end, finer),
+    ]
+
+
+@dataclass
+class RangeResult:
+    """Values of the leading chunks of the ranges that were fetched successfully.
+
+    `failed_at` is the start of the first chunk that failed, values at or after
+    it must not be imported.
+    """
+
+    values: list[dict] = field(default_factory=list)
+    failed_at: datetime | None = None
+    error: EnergiinfoError | None = None
+
+
+PeriodValuesFetcher = Callable[[str, str, str, str], Awaitable[list[dict]]]
+
+
+async def async_fetch_ranges(
+    get_period_values: PeriodValuesFetcher,
+    semaphore: asyncio.Semaphore,
+    meter_id: str,
+    ranges: list[tuple[datetime, datetime]],
+    signal: str = "ActiveEnergy",
+    interval: str = "hour",
+    max_days: int = CONF_MAX_DAYS_BACK,
+) -> RangeResult:
+    """Fetch ranges in chunks of max_days days concurrently.
+
+    At most as many chunks as the semaphore allows are in flight at once. The
+    values are returned in chronological order and stop at the first chunk that
+    failed, so the caller never imports data past a hole.
+    """
+
+    async def _async_fetch_chunk(chunk: tuple[datetime, datetime]) -> list[dict]:
+        async with semaphore:
+            return await get_period_values(
+                meter_id, format_period(*chunk), signal, interval
+            )
+
+    chunks = [
+        chunk for start, end in ranges for chunk in split_range(start, end, max_days)
+    ]
+    _LOGGER.debug(
+        f"Fetching {meter_id} for {len(ranges)} ranges in {len(chunks)} chunks"
+    )
+    results = await asyncio.gather(
+        *(_async_fetch_chunk(chunk) for chunk in chunks), return_exceptions=True
+    )
+
+    fetched = RangeResult()
+    chunk_values = []
+    for (chunk_start, _), values in zip(chunks, results):
+        if isinstance(values, EnergiinfoError):
+            fetched.failed_at = chunk_start
+            fetched.error = values
+            break
+        if isinstance(values, BaseException):
+            raise values
+        chunk_values.append(values)
+    fetched.values = list(itertools.chain.from_iterable(chunk_values))
+    return fetched
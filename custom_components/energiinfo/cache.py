@@ -0,0 +1,135 @@
+"""Local cache of the raw hourly readings fetched by the energiinfo integration."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+import threading
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant
+
+from .const import DOMAIN, DATA_READING_CACHE
+
+_LOGGER = logging.getLogger(__name__)
+
+DATABASE_FILE = f"{DOMAIN}_readings.db"
+
+
+def hour_key(dt: datetime) -> int:
+    """Return the `YYYYMMDDHH` key of the hour dt is in."""
+    return int(dt.strftime("%Y%m%d%H"))
+
+
+def missing_ranges(
+    keys: set[int], start: datetime, end: datetime
+) -> list[tuple[datetime, datetime]]:
+    """Return the ranges of hours between start and end (inclusive) not in keys."""
+    ranges = []
+    gap_start = None
+    hour = start
+    while hour <= end:
+        if hour_key(hour) in keys:
+            if gap_start is not None:
+                ranges.append((gap_start, hour - timedelta(hours=1)))
+                gap_start = None
+        elif gap_start is None:
+            gap_start = hour
+        hour += timedelta(hours=1)
+    if gap_start is not None:
+        ranges.append((gap_start, end))
+    return ranges
+
+
+def async_get_reading_cache(hass: HomeAssistant) -> ReadingCache:
+    """Return the reading cache shared by all config entries."""
+    if (cache := hass.data[DOMAIN].get(DATA_READING_CACHE)) is None:
+        cache = hass.data[DOMAIN][DATA_READING_CACHE] = ReadingCache(
+            hass, hass.config.path(".storage", DATABASE_FILE)
+        )
+
+        async def _async_close(event: Event) -> None:
+            await hass.async_add_executor_job(cache.close)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close)
+    return cache
+
+
+class ReadingCache:
+    """SQLite table of raw hourly values keyed by meter and `YYYYMMDDHH` hour.
+
+    Everything fetched from get_period_values ends up here, so re-imports and
+    longer days_back only need the API for the hours that were never fetched.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the cache, the database is opened on first use."""
+        self._hass = hass
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS readings ("
+                " meter_id TEXT NOT NULL,"
+                " hour INTEGER NOT NULL,"
+                " value REAL NOT NULL,"
+                " PRIMARY KEY (meter_id, hour)"
+                ") WITHOUT ROWID"
+            )
+        return self._connection
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_range(self, meter_id: str, start: int, end: int) -> list[dict]:
+        """Return the cached rows between two hour keys, inclusive."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT hour, value FROM readings"
+                " WHERE meter_id = ? AND hour BETWEEN ? AND ? ORDER BY hour",
+                (meter_id, start, end),
+            )
+            return [{"time": str(hour), "value": value} for hour, value in cursor]
+
+    def store(self, meter_id: str, rows: list[dict]) -> None:
+        """Insert or replace fetched rows."""
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO readings (meter_id, hour, value)"
+                " VALUES (?, ?, ?)",
+                [(meter_id, int(row["time"]), float(row["value"])) for row in rows],
+            )
+
+    def remove(self, meter_ids: list[str]) -> None:
+        """Delete every cached row of the meters."""
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM readings WHERE meter_id = ?",
+                [(meter_id,) for meter_id in meter_ids],
+            )
+
+    async def async_get_range(
+        self, meter_id: str, start: datetime, end: datetime
+    ) -> list[dict]:
+        """Return the cached rows between start and end, inclusive."""
+        return await self._hass.async_add_executor_job(
+            self.get_range, meter_id, hour_key(start), hour_key(end)
+        )
+
+    async def async_store(self, meter_id: str, rows: list[dict]) -> None:
+        """Insert or replace fetched rows."""
+        if rows:
+            await self._hass.async_add_executor_job(self.store, meter_id, rows)
+
+    async def async_remove(self, meter_ids: list[str]) -> None:
+        """Delete every cached row of the meters."""
+        await self._hass.async_add_executor_job(self.remove, meter_ids)
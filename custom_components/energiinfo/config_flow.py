@@ -7,26 +7,48 @@ from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, OptionsFlow
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
 from homeassistant.const import CONF_NAME, CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import HomeAssistantError
-from energiinfo.api import EnergiinfoClient
-from homeassistant.helpers import (
-    device_registry as dr,
-    entity_registry as er,
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import homeassistant.helpers.config_validation as cv
+
+from .api import (
+    EnergiinfoApiClient,
+    EnergiinfoConnectionError,
+    EnergiinfoError,
+)
+from .coordinator import (
+    AccountKey,
+    EnergiinfoCoordinator,
+    account_id,
+    account_key,
+    entry_meters,
 )
+from .discovery import async_get_discovery_cache
+from .governor import async_get_governor
 
 from .const import (
     DOMAIN,
     CONF_URL,
     CONF_SITEID,
     CONF_METERID,
+    CONF_ALIAS,
+    CONF_METERS,
     CONF_STORED_TOKEN,
     CONF_DAYS_BACK,
     CONF_LAST_UPDATE,
-    CONF_MAX_DAYS_BACK,
+    CONF_COVERED,
+    DATA_ACCOUNTS,
+    CONF_BACKFILL_PARALLELISM,
+    CONF_QUANTITIES,
+    CONF_HOURLY_DAYS,
+    CONF_PRICE_ENTITY,
+    CONF_PRICE_FILE,
+    DEFAULT_BACKFILL_PARALLELISM,
+    DEFAULT_HOURLY_DAYS,
 )
+from .quantities import ENERGY, QUANTITIES
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,14 +62,45 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
         vol.Required(CONF_USERNAME): str,
         vol.Required(CONF_PASSWORD): str,
         vol.Required(CONF_DAYS_BACK): int,
+        vol.Optional(
+            CONF_BACKFILL_PARALLELISM, default=DEFAULT_BACKFILL_PARALLELISM
+        ): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_HOURLY_DAYS, default=DEFAULT_HOURLY_DAYS): vol.All(
+            int, vol.Range(min=1)
+        ),
+        # Energy cost is imported if either price source is set
+        vol.Optional(CONF_PRICE_ENTITY): str,
+        vol.Optional(CONF_PRICE_FILE): str,
     }
 )
 
+# Quantities that can be imported per meter, energy is always imported
+QUANTITY_CHOICES = {
+    key: quantity.name or "Energy" for key, quantity in QUANTITIES.items()
+}
+
+
+def quantity_keys(selected: list[str]) -> list[str]:
+    """Return the selected quantities, with energy first whether selected or not."""
+    return [ENERGY, *(key for key in selected if key != ENERGY)]
+
+
 STEP_RECONF_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_USERNAME): str,
         vol.Required(CONF_PASSWORD): str,
         vol.Required(CONF_DAYS_BACK): int,
+        vol.Optional(
+            CONF_BACKFILL_PARALLELISM, default=DEFAULT_BACKFILL_PARALLELISM
+        ): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_HOURLY_DAYS, default=DEFAULT_HOURLY_DAYS): vol.All(
+            int, vol.Range(min=1)
+        ),
+        vol.Optional(CONF_QUANTITIES, default=[ENERGY]): cv.multi_select(
+            QUANTITY_CHOICES
+        ),
+        vol.Optional(CONF_PRICE_ENTITY): str,
+        vol.Optional(CONF_PRICE_FILE): str,
     }
 )
 
@@ -86,26 +139,50 @@ class EnergiinfoConfigFlow(ConfigFlow, domain=DOMAIN):
 
     def __init__(self) -> None:
         """Initialize the config flow."""
+        self.__coordinator: EnergiinfoCoordinator | None = None
+        self.__discovery: dict[str, str] | None = None
 
     async def authenticate(
         self, username: str, password: str
     ) -> tuple[bool, dict[str, Any]]:
         """Authenticate"""
-        token = await self.hass.async_add_executor_job(
-            self.__api.authenticate, username, password
-        )
-        self.__token = token
-        if self.__api.getStatus() == "ERR":
-            _LOGGER.error(self.__api.getErrorMessage)
-            raise InvalidAuth
-        return self.__api.getStatus()
+        try:
+            self.__token = await self.__api.async_authenticate(username, password)
+        except EnergiinfoConnectionError as err:
+            _LOGGER.error(err.error_message)
+            raise CannotConnect from err
+        except EnergiinfoError as err:
+            _LOGGER.error(err.error_message)
+            raise InvalidAuth from err
+        return "OK"
 
     async def get_meter_ids(self) -> tuple[bool, dict[str, Any]]:
         """Get the meterid"""
-        meter_list = await self.hass.async_add_executor_job(
-            self.__api.get_metering_points
-        )
-        return self.__api.getStatus(), meter_list
+        # Shared with other flows and the background discovery of the account,
+        # the meters step asks the API at most once per DISCOVERY_TTL
+        try:
+            meter_list = await async_get_discovery_cache(self.hass).async_get(
+                (self.__apiurl, self.__siteid, self.__username),
+                self.__coordinator.async_get_metering_points
+                if self.__coordinator is not None
+                else self.__api.async_get_metering_points,
+            )
+        except EnergiinfoError as err:
+            _LOGGER.error(err.error_message)
+            return err.status, []
+        return "OK", meter_list
+
+    def _async_account_entries(self, key: AccountKey) -> list[ConfigEntry]:
+        """Return the set up config entries of an account."""
+        return [
+            entry
+            for entry in self._async_current_entries(include_ignore=False)
+            if account_key(entry.data) == key
+        ]
+
+    def _async_account_entry(self, key: AccountKey) -> ConfigEntry | None:
+        """Return a set up config entry of an account."""
+        return next(iter(self._async_account_entries(key)), None)
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -119,12 +196,34 @@ class EnergiinfoConfigFlow(ConfigFlow, domain=DOMAIN):
                 self.__username = user_input[CONF_USERNAME]
                 self.__password = user_input[CONF_PASSWORD]
                 self.__days_back = user_input[CONF_DAYS_BACK]
-                self.__api = EnergiinfoClient(
-                    user_input[CONF_URL], user_input[CONF_SITEID]
+                self.__backfill_parallelism = user_input[CONF_BACKFILL_PARALLELISM]
+                self.__hourly_days = user_input[CONF_HOURLY_DAYS]
+                self.__price_entity = user_input.get(CONF_PRICE_ENTITY)
+                self.__price_file = user_input.get(CONF_PRICE_FILE)
+                self.__api = EnergiinfoApiClient(
+                    async_get_clientsession(self.hass),
+                    user_input[CONF_URL],
+                    user_input[CONF_SITEID],
+                    governor=async_get_governor(self.hass, user_input[CONF_URL]),
                 )
-                status = await self.authenticate(
-                    user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
+                # An account that is set up with the same password already has a
+                # token, its coordinator is used instead of logging in again
+                key = account_key(user_input)
+                entry = self._async_account_entry(key)
+                coordinator = (
+                    self.hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {}).get(key)
                 )
+                if (
+                    entry is not None
+                    and coordinator is not None
+                    and entry.data[CONF_PASSWORD] == user_input[CONF_PASSWORD]
+                ):
+                    self.__coordinator = coordinator
+                    self.__token = entry.data[CONF_STORED_TOKEN]
+                else:
+                    await self.authenticate(
+                        user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
+                    )
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
@@ -157,44 +256,132 @@ class EnergiinfoConfigFlow(ConfigFlow, domain=DOMAIN):
         # token = user_input.get("token")
         success, meters = await self.get_meter_ids()
 
+        # Meters already set up for this account are not offered again
+        configured = {
+            meter_id
+            for entry in self._async_current_entries()
+            if account_key(entry.data)
+            == (self.__apiurl, self.__siteid, self.__username)
+            for meter_id in entry_meters(entry.data)
+        }
         meter_choices = {
             meter["meteringpoint_id"]: meter["alias"].replace("\r\n", ",")
             for meter in meters
+            if meter["meteringpoint_id"] not in configured
         }
         if not meter_choices:
             return self.async_abort(reason="no_meters")
 
-        # Generate a list of available meters for the user to choose from
-        meter_schema = vol.Schema(vol.In(meter_choices))
+        errors: dict[str, str] = {}
         if user_input is not None:
-            # User has selected a meter, finish the flow
-            meter_id = user_input["meter_id"]
-            meter_alias = meter_choices[meter_id]
-            return self.async_create_entry(
-                title=meter_alias,
-                data={
-                    "meter_id": meter_id,
-                    "alias": meter_alias,
-                    CONF_STORED_TOKEN: self.__token,
-                    CONF_URL: self.__apiurl,
-                    CONF_SITEID: self.__siteid,
-                    CONF_USERNAME: self.__username,
-                    CONF_PASSWORD: self.__password,
-                    CONF_DAYS_BACK: self.__days_back,
-                    CONF_LAST_UPDATE: None,
-                },
-            )
+            # One entry for all selected meters, they share the login
+            meter_ids = user_input[CONF_METERS]
+            if not meter_ids:
+                errors["base"] = "no_meters_selected"
+            else:
+                return self.async_create_entry(
+                    title=meter_choices[meter_ids[0]]
+                    if len(meter_ids) == 1
+                    else f"{self.__username} ({len(meter_ids)} meters)",
+                    data={
+                        CONF_METERS: [
+                            {
+                                CONF_METERID: meter_id,
+                                CONF_ALIAS: meter_choices[meter_id],
+                            }
+                            for meter_id in meter_ids
+                        ],
+                        CONF_STORED_TOKEN: self.__token,
+                        CONF_URL: self.__apiurl,
+                        CONF_SITEID: self.__siteid,
+                        CONF_USERNAME: self.__username,
+                        CONF_PASSWORD: self.__password,
+                        CONF_DAYS_BACK: self.__days_back,
+                        CONF_BACKFILL_PARALLELISM: self.__backfill_parallelism,
+                        CONF_HOURLY_DAYS: self.__hourly_days,
+                        CONF_PRICE_ENTITY: self.__price_entity,
+                        CONF_PRICE_FILE: self.__price_file,
+                        CONF_QUANTITIES: quantity_keys(user_input[CONF_QUANTITIES]),
+                        CONF_LAST_UPDATE: None,
+                    },
+                )
 
-        # Display meter selection form
+        # Display meter selection form, all meters are selected by default
         return self.async_show_form(
             step_id="meter",
             data_schema=vol.Schema(
                 {
-                    vol.Required("meter_id", description="Select a meter"): vol.In(
-                        meter_choices
-                    )
+                    vol.Required(
+                        CONF_METERS, default=list(meter_choices)
+                    ): cv.multi_select(meter_choices),
+                    vol.Optional(CONF_QUANTITIES, default=[ENERGY]): cv.multi_select(
+                        QUANTITY_CHOICES
+                    ),
                 }
             ),
+            errors=errors,
+        )
+
+    async def async_step_integration_discovery(
+        self, discovery_info: dict[str, str]
+    ) -> ConfigFlowResult:
+        """Handle a metering point found on an account that is set up."""
+        key = account_key(discovery_info)
+        meter_id = discovery_info[CONF_METERID]
+        await self.async_set_unique_id(f"{account_id(key)}|{meter_id}")
+        self._abort_if_unique_id_configured()
+        if not (entries := self._async_account_entries(key)):
+            return self.async_abort(reason="account_not_configured")
+        if any(meter_id in entry_meters(entry.data) for entry in entries):
+            return self.async_abort(reason="already_configured")
+
+        self.__discovery = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info[CONF_ALIAS]}
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a discovered metering point with the settings of its account."""
+        assert self.__discovery
+        placeholders = {
+            "alias": self.__discovery[CONF_ALIAS],
+            "meter_id": self.__discovery[CONF_METERID],
+            "username": self.__discovery[CONF_USERNAME],
+        }
+        if user_input is None:
+            return self.async_show_form(
+                step_id="discovery_confirm", description_placeholders=placeholders
+            )
+
+        # The login and the settings of an entry of the account are reused,
+        # unless the meter was added by hand in the meantime
+        entries = self._async_account_entries(account_key(self.__discovery))
+        if not entries:
+            return self.async_abort(reason="account_not_configured")
+        if any(
+            self.__discovery[CONF_METERID] in entry_meters(entry.data)
+            for entry in entries
+        ):
+            return self.async_abort(reason="already_configured")
+        entry = entries[0]
+        data = {
+            key: value
+            for key, value in entry.data.items()
+            if key not in (CONF_METERID, CONF_ALIAS, CONF_COVERED)
+        }
+        return self.async_create_entry(
+            title=self.__discovery[CONF_ALIAS],
+            data={
+                **data,
+                CONF_METERS: [
+                    {
+                        CONF_METERID: self.__discovery[CONF_METERID],
+                        CONF_ALIAS: self.__discovery[CONF_ALIAS],
+                    }
+                ],
+                CONF_LAST_UPDATE: None,
+            },
         )
 
     async def async_step_reconfigure(
@@ -214,8 +401,13 @@ class EnergiinfoConfigFlow(ConfigFlow, domain=DOMAIN):
         assert self.config_entry
 
         if user_input is not None:
-            self.__api = EnergiinfoClient(
-                self.config_entry.data[CONF_URL], self.config_entry.data[CONF_SITEID]
+            self.__api = EnergiinfoApiClient(
+                async_get_clientsession(self.hass),
+                self.config_entry.data[CONF_URL],
+                self.config_entry.data[CONF_SITEID],
+                governor=async_get_governor(
+                    self.hass, self.config_entry.data[CONF_URL]
+                ),
             )
             try:
                 status = await self.authenticate(
@@ -223,6 +415,12 @@ class EnergiinfoConfigFlow(ConfigFlow, domain=DOMAIN):
                 )
                 if status == "OK":
                     user_input[CONF_STORED_TOKEN] = self.__token
+                    user_input[CONF_QUANTITIES] = quantity_keys(
+                        user_input.get(CONF_QUANTITIES, [])
+                    )
+                    # A cleared price source field is left out of the input
+                    user_input.setdefault(CONF_PRICE_ENTITY, None)
+                    user_input.setdefault(CONF_PRICE_FILE, None)
                     days_back: int = user_input[CONF_DAYS_BACK]
                     old_days_back = self.config_entry.data[CONF_DAYS_BACK]
                     _LOGGER.debug(
@@ -1,6 +1,8 @@
 """Constants for the energiinfo integration."""
 
 import logging
+from datetime import timedelta
+
 from homeassistant.const import Platform
 
 DOMAIN = "energiinfo"
@@ -10,9 +12,92 @@ LOGGER = logging.getLogger(__package__)
 CONF_URL = "url"
 CONF_SITEID = "site_id"
 CONF_METERID = "meter_id"
+CONF_ALIAS = "alias"
+CONF_METERS = "meters"
 CONF_STORED_TOKEN: str = "stored_token"
 CONF_DAYS_BACK = "days_back"
 CONF_LAST_UPDATE = "last_update"
+CONF_COVERED = "covered"
+CONF_BACKFILL_PARALLELISM = "backfill_parallelism"
+CONF_QUANTITIES = "quantities"
+CONF_HOURLY_DAYS = "hourly_days"
+CONF_COARSE = "coarse"
+CONF_FINGERPRINTS = "fingerprints"
+CONF_PRICE_ENTITY = "price_entity"
+CONF_PRICE_FILE = "price_file"
+CONF_COST_COVERED = "cost_covered"
+CONF_ROLLUPS = "rollups"
+
+# Signal of the hourly energy every meter is imported for
+SIGNAL_ACTIVE_ENERGY = "ActiveEnergy"
 
-# How many days back MAXIMUM to calculate
+# How many days MAXIMUM to request in one get_period_values call
 CONF_MAX_DAYS_BACK = 90
+# Days per get_period_values call at day and month resolution
+DAY_MAX_DAYS_BACK = 366
+MONTH_MAX_DAYS_BACK = 3660
+# History older than this many days is imported per day instead of per hour
+DEFAULT_HOURLY_DAYS = 365
+# History older than this many days is imported per month
+MONTHLY_AFTER_DAYS = 730
+# How many of those periods to request concurrently per account
+DEFAULT_BACKFILL_PARALLELISM = 4
+# Periods a backfill job requests at once, on top of the poll cycle
+BACKFILL_JOB_PARALLELISM = 2
+# Missing ranges at most this far apart are fetched in one period
+MAX_MERGED_GAP = timedelta(days=2)
+# Hours missing from the API this close to the newest value are asked for again
+LATE_DATA_WINDOW = timedelta(days=7)
+# Trailing window fetched again to find values the grid operator corrected
+CORRECTION_WINDOW = timedelta(days=14)
+# How often the correction window is fetched again
+CORRECTION_CHECK_INTERVAL = timedelta(hours=24)
+# How long discovered metering points are used, and how often the
+# coordinators look for new ones
+DISCOVERY_TTL = timedelta(hours=6)
+
+# Poll interval while any meter of an account is still catching up
+UPDATE_INTERVAL = timedelta(minutes=1)
+# Longest poll interval once every meter of an account has caught up
+CAUGHT_UP_UPDATE_INTERVAL = timedelta(hours=2)
+# Poll interval during the hours new values are usually published
+DENSE_UPDATE_INTERVAL = timedelta(minutes=10)
+# First poll interval outside those hours, doubled after every empty poll
+BACKOFF_UPDATE_INTERVAL = timedelta(minutes=15)
+# Wait before a series whose fetch failed is asked for again, doubled for
+# every further failed cycle up to CAUGHT_UP_UPDATE_INTERVAL
+SERIES_RETRY_INTERVAL = timedelta(minutes=5)
+# Random spread applied to caught up poll intervals
+UPDATE_INTERVAL_JITTER = 0.1
+# Delay used to coalesce refresh requests from sensors into one poll cycle
+REQUEST_REFRESH_DELAY = 5
+
+# Requests per second to one API host, shared by all entries using it
+RATE_LIMIT = 5
+# Requests that may be sent to one API host at once before the rate applies
+RATE_LIMIT_BURST = 10
+# Attempts for a request failing with a connection error
+RETRY_ATTEMPTS = 3
+# Seconds before the first retry, doubled for every further retry
+RETRY_BACKOFF = 2
+RETRY_BACKOFF_MAX = 30
+# Failed requests in a row after which requests to the host are paused
+CIRCUIT_FAILURE_THRESHOLD = 5
+# Seconds requests stay paused before one is let through to probe the host
+CIRCUIT_RESET_TIMEOUT = 300
+
+# How long a validated token is used before it is validated again
+TOKEN_VALIDITY = timedelta(hours=1)
+
+# hass.data[DOMAIN] key holding the coordinators shared per account
+DATA_ACCOUNTS = "accounts"
+# hass.data[DOMAIN] key holding the request governors shared per API host
+DATA_GOVERNORS = "governors"
+# hass.data[DOMAIN] key holding the store of the sync state
+DATA_SYNC_STORE = "sync_store"
+# hass.data[DOMAIN] key holding the active UpdateProfiler
+DATA_PROFILER = "profiler"
+# hass.data[DOMAIN] key holding the cache of raw hourly readings
+DATA_READING_CACHE = "reading_cache"
+# hass.data[DOMAIN] key holding the discovered metering points per account
+DATA_DISCOVERY = "discovery"
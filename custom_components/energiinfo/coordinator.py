@@ -0,0 +1,641 @@
+"""Account level update coordinator for the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import logging
+import time
+
+from homeassistant.config_entries import (
+    SOURCE_IGNORE,
+    SOURCE_INTEGRATION_DISCOVERY,
+    ConfigEntry,
+)
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import discovery_flow
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dtutil
+
+from .api import EnergiinfoApiClient, EnergiinfoError
+from .auth import TokenManager
+from .backfill import RangeResult, async_fetch_ranges, merge_ranges
+from .cache import async_get_reading_cache, hour_key, missing_ranges
+from .discovery import async_get_discovery_cache
+from .governor import async_get_governor
+from .jobs import BackfillJob
+from .metrics import ApiMetrics, SeriesMetrics
+from .trace import PollTrace, TraceBuffer
+from .scheduler import PublicationScheduler
+from .store import EnergiinfoSyncStore
+from .const import (
+    DOMAIN,
+    CONF_URL,
+    CONF_SITEID,
+    CONF_METERID,
+    CONF_ALIAS,
+    CONF_METERS,
+    CONF_STORED_TOKEN,
+    CONF_BACKFILL_PARALLELISM,
+    DEFAULT_BACKFILL_PARALLELISM,
+    BACKFILL_JOB_PARALLELISM,
+    SIGNAL_ACTIVE_ENERGY,
+    DAY_MAX_DAYS_BACK,
+    MONTH_MAX_DAYS_BACK,
+    UPDATE_INTERVAL,
+    CAUGHT_UP_UPDATE_INTERVAL,
+    SERIES_RETRY_INTERVAL,
+    REQUEST_REFRESH_DELAY,
+    MAX_MERGED_GAP,
+    DISCOVERY_TTL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+AccountKey = tuple[str, str, str]
+# Starts a backfill job of a series for start..end
+BackfillStarter = Callable[[datetime, datetime], BackfillJob]
+
+
+def account_key(data: dict) -> AccountKey:
+    """Return the key identifying the account a config entry belongs to."""
+    return (data[CONF_URL], data[CONF_SITEID], data[CONF_USERNAME])
+
+
+def account_id(key: AccountKey) -> str:
+    """Return the account key as a string usable in storage."""
+    return "|".join(key)
+
+
+def entry_meters(data: dict) -> dict[str, str]:
+    """Return the meter ids and aliases of a config entry.
+
+    Entries from before multi-meter entries hold a single meter_id and alias.
+    """
+    if CONF_METERS in data:
+        return {meter[CONF_METERID]: meter[CONF_ALIAS] for meter in data[CONF_METERS]}
+    return {data[CONF_METERID]: data[CONF_ALIAS]}
+
+
+def series_id(meter_id: str, signal: str = SIGNAL_ACTIVE_ENERGY) -> str:
+    """Return the id a signal of a meter is cached, stored and fetched under.
+
+    The energy signal keeps the plain meter id used before other signals.
+    """
+    return meter_id if signal == SIGNAL_ACTIVE_ENERGY else f"{meter_id}:{signal}"
+
+
+# Days per request by the interval of the values
+MAX_DAYS = {"day": DAY_MAX_DAYS_BACK, "month": MONTH_MAX_DAYS_BACK}
+
+
+@dataclass
+class MeterRequest:
+    """The ranges (inclusive hours) a meter wants fetched in the next cycle.
+
+    `coarse` holds (start, end, interval) ranges of whole days or months, end
+    exclusive, wanted as one value per day or month. `recheck` ranges were
+    imported already and are fetched again, without the cache, to find
+    corrected values.
+    """
+
+    ranges: list[tuple[datetime, datetime]]
+    caught_up: bool = False
+    coarse: list[tuple[datetime, datetime, str]] = field(default_factory=list)
+    recheck: list[tuple[datetime, datetime]] = field(default_factory=list)
+
+
+@dataclass
+class CoarseFetch:
+    """The values of one coarse range, None if fetching it failed."""
+
+    start: datetime
+    end: datetime
+    interval: str
+    values: list[dict] | None
+
+
+@dataclass
+class MeterFetch:
+    """The outcome of fetching one meter's ranges in a poll cycle.
+
+    When a chunk failed, `failed_at` is its first hour and the values stop
+    before it. `recheck` holds the values of the recheck ranges, None if
+    there were none or fetching them failed. `newest` is the newest time the
+    API returned in this cycle, cached rows left out.
+    """
+
+    ranges: list[tuple[datetime, datetime]]
+    values: list[dict] | None
+    status: str | None
+    error_message: str | None = None
+    failed_at: datetime | None = None
+    coarse: list[CoarseFetch] = field(default_factory=list)
+    recheck: list[dict] | None = None
+    newest: str | None = None
+
+
+@dataclass
+class StartupTiming:
+    """How long a config entry took to set up and to get its first values."""
+
+    started: float = field(default_factory=time.monotonic)
+    setup_seconds: float | None = None
+    first_update_seconds: float | None = None
+
+
+class EnergiinfoCoordinator(DataUpdateCoordinator[dict[str, MeterFetch]]):
+    """Fetch the period values of every meter on one account in one cycle.
+
+    Config entries sharing url, site_id and username share one coordinator, so
+    they share one token and all registered meters are fetched concurrently in
+    one cycle instead of one poll loop per sensor.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        sync_store: EnergiinfoSyncStore,
+    ) -> None:
+        """Initialize the coordinator from the first entry of the account."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {config_entry.data[CONF_URL]} "
+            f"{config_entry.data[CONF_SITEID]}",
+            update_interval=UPDATE_INTERVAL,
+            # Sensors ask for a refresh when added, coalesce them into one cycle
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=REQUEST_REFRESH_DELAY, immediate=False
+            ),
+        )
+        self.account_key = account_key(config_entry.data)
+        # Requests of every account on the same host share one governor
+        self.governor = async_get_governor(hass, config_entry.data[CONF_URL])
+        self.metrics = ApiMetrics()
+        self.series_metrics: dict[str, SeriesMetrics] = {}
+        self.traces = TraceBuffer()
+        self._client = EnergiinfoApiClient(
+            async_get_clientsession(hass),
+            config_entry.data[CONF_URL],
+            config_entry.data[CONF_SITEID],
+            governor=self.governor,
+            metrics=self.metrics,
+        )
+        self.sync_store = sync_store
+        self.tokens = TokenManager(
+            sync_store,
+            self._client,
+            account_id(self.account_key),
+            config_entry.data[CONF_USERNAME],
+            config_entry.data[CONF_PASSWORD],
+            config_entry.data[CONF_STORED_TOKEN],
+        )
+        self._parallelism = DEFAULT_BACKFILL_PARALLELISM
+        # The learned publication window survives restarts
+        self.scheduler = PublicationScheduler(
+            sync_store.account(account_id(self.account_key)).get("scheduler")
+        )
+        self._cache = async_get_reading_cache(hass)
+        self._entries: dict[str, ConfigEntry] = {}
+        # Registered series by series id, with their meter and signal
+        self._meters: dict[str, tuple[str, str, Callable[[], MeterRequest]]] = {}
+        self._backfill_starters: dict[str, BackfillStarter] = {}
+        # Wait and time of the next attempt of series whose last fetch failed
+        self._series_backoff: dict[str, tuple[timedelta, datetime]] = {}
+        # The latest backfill job of every series
+        self.backfills: dict[str, BackfillJob] = {}
+        self.startup: dict[str, StartupTiming] = {}
+        self._unsub_started: CALLBACK_TYPE | None = None
+        self._unsub_discovery: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add_entry(self, config_entry: ConfigEntry) -> None:
+        """Attach a config entry of this account."""
+        self._entries[config_entry.entry_id] = config_entry
+        self.startup[config_entry.entry_id] = StartupTiming()
+        # A reconfigured entry brings the latest credentials for the account
+        self.tokens.update_credentials(
+            config_entry.data[CONF_PASSWORD], config_entry.data[CONF_STORED_TOKEN]
+        )
+        self._parallelism = config_entry.data.get(
+            CONF_BACKFILL_PARALLELISM, DEFAULT_BACKFILL_PARALLELISM
+        )
+
+        # The token is validated by the first cycle, which waits for Home
+        # Assistant to finish starting so a slow API does not delay it
+        if self._unsub_started is None:
+            self._unsub_started = async_at_started(self.hass, self._async_at_started)
+        # Metering points added to the account later are offered as discovered
+        if self._unsub_discovery is None:
+            self._unsub_discovery = async_track_time_interval(
+                self.hass, self._async_discover, DISCOVERY_TTL
+            )
+
+    async def _async_at_started(self, hass: HomeAssistant) -> None:
+        """Run the first cycle once Home Assistant has started."""
+        self._unsub_started = None
+        await self.async_request_refresh()
+
+    @callback
+    def async_setup_done(self, config_entry: ConfigEntry, started: float) -> None:
+        """Record how long setting up a config entry took since started."""
+        timing = self.startup[config_entry.entry_id]
+        timing.started = started
+        timing.setup_seconds = time.monotonic() - started
+        _LOGGER.debug(
+            f"Set up {config_entry.title} in {timing.setup_seconds * 1000:.1f} ms"
+        )
+
+    @callback
+    def async_remove_entry(self, config_entry: ConfigEntry) -> bool:
+        """Detach a config entry, return True if it was the last one."""
+        self._entries.pop(config_entry.entry_id, None)
+        self.startup.pop(config_entry.entry_id, None)
+        if not self._entries and self._unsub_started is not None:
+            self._unsub_started()
+            self._unsub_started = None
+        if not self._entries and self._unsub_discovery is not None:
+            self._unsub_discovery()
+            self._unsub_discovery = None
+        return not self._entries
+
+    @callback
+    def async_register_meter(
+        self,
+        meter_id: str,
+        get_request: Callable[[], MeterRequest],
+        signal: str = SIGNAL_ACTIVE_ENERGY,
+        start_backfill: BackfillStarter | None = None,
+    ) -> CALLBACK_TYPE:
+        """Include a signal of a meter in the poll cycle until the returned
+        callback is called. The values are in the data under its series id.
+        """
+        key = series_id(meter_id, signal)
+        self._meters[key] = (meter_id, signal, get_request)
+        self.series_metrics.setdefault(key, SeriesMetrics())
+        if start_backfill is not None:
+            self._backfill_starters[key] = start_backfill
+
+        @callback
+        def _unregister() -> None:
+            self._meters.pop(key, None)
+            self.series_metrics.pop(key, None)
+            self._backfill_starters.pop(key, None)
+            self._series_backoff.pop(key, None)
+            if (job := self.backfills.pop(key, None)) is not None:
+                job.cancel()
+
+        return _unregister
+
+    def has_series(self, key: str) -> bool:
+        """Return True if a series is registered with this coordinator."""
+        return key in self._meters
+
+    @callback
+    def async_start_backfill(
+        self, key: str, start: datetime, end: datetime
+    ) -> BackfillJob:
+        """Start re-importing start..end of a registered series in the background."""
+        if (job := self.backfills.get(key)) is not None and job.running:
+            raise HomeAssistantError(f"A backfill of {key} is already running")
+        if (start_backfill := self._backfill_starters.get(key)) is None:
+            raise HomeAssistantError(f"{key} does not support backfills")
+        job = self.backfills[key] = start_backfill(start, end)
+        return job
+
+    async def async_get_cached(
+        self, key: str, start: datetime, end: datetime
+    ) -> list[dict]:
+        """Return the cached rows of a series between start and end, inclusive."""
+        return await self._cache.async_get_range(key, start, end)
+
+    async def async_fetch_history(
+        self, meter_id: str, signal: str, ranges: list[tuple[datetime, datetime]]
+    ) -> RangeResult:
+        """Fetch ranges (inclusive hours) for a backfill job, outside the cycle.
+
+        The cached hours are fetched again, the API may have revised them, and
+        replaced by what it returns.
+        """
+        fetched = await async_fetch_ranges(
+            self._async_get_period_values,
+            asyncio.Semaphore(BACKFILL_JOB_PARALLELISM),
+            meter_id,
+            ranges,
+            signal,
+        )
+        await self._cache.async_store(series_id(meter_id, signal), fetched.values)
+        return fetched
+
+    async def async_get_metering_points(self) -> list[dict]:
+        """Return the metering points of the account, with the shared token."""
+        return await self.tokens.async_call(self._client.async_get_metering_points)
+
+    async def _async_discover(self, now: datetime | None = None) -> None:
+        """Start a discovery flow for every metering point not set up yet."""
+        try:
+            meters = await async_get_discovery_cache(self.hass).async_get(
+                self.account_key, self.async_get_metering_points, refresh=True
+            )
+        except EnergiinfoError as err:
+            _LOGGER.debug(
+                f"Looking for new metering points failed: {err.error_message}"
+            )
+            return
+        configured = {
+            meter_id
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.source != SOURCE_IGNORE
+            and account_key(entry.data) == self.account_key
+            for meter_id in entry_meters(entry.data)
+        }
+        for meter in meters:
+            if meter["meteringpoint_id"] in configured:
+                continue
+            discovery_flow.async_create_flow(
+                self.hass,
+                DOMAIN,
+                context={"source": SOURCE_INTEGRATION_DISCOVERY},
+                data={
+                    CONF_URL: self.account_key[0],
+                    CONF_SITEID: self.account_key[1],
+                    CONF_USERNAME: self.account_key[2],
+                    CONF_METERID: meter["meteringpoint_id"],
+                    CONF_ALIAS: meter["alias"].replace("\r\n", ","),
+                },
+            )
+
+    async def async_logout(self) -> None:
+        """Log out the account."""
+        try:
+            await self._client.async_logout()
+        except EnergiinfoError as err:
+            _LOGGER.debug(f"Logout failed: {err.error_message}")
+
+    async def _async_update_data(self) -> dict[str, MeterFetch]:
+        """Validate the token and fetch every registered series."""
+        # Series that keep failing are left out until their backoff passed
+        now = dtutil.utcnow()
+        meters = {
+            key: meter
+            for key, meter in self._meters.items()
+            if key not in self._series_backoff or self._series_backoff[key][1] <= now
+        }
+        requests = {key: get() for key, (_, _, get) in meters.items()}
+        if not requests:
+            return {}
+
+        trace = PollTrace(started=dtutil.utcnow())
+        self.traces.append(trace)
+        calls, size = self.metrics.calls_total, self.metrics.bytes_total
+        try:
+            return await self._async_fetch_all(trace, meters, requests)
+        except UpdateFailed as err:
+            trace.error = str(err)
+            raise
+        finally:
+            trace.api_calls = self.metrics.calls_total - calls
+            trace.payload_bytes = self.metrics.bytes_total - size
+
+    async def _async_fetch_all(
+        self,
+        trace: PollTrace,
+        meters: dict[str, tuple[str, str, Callable[[], MeterRequest]]],
+        requests: dict[str, MeterRequest],
+    ) -> dict[str, MeterFetch]:
+        """Run the phases of a poll cycle, timing them in the trace."""
+        if self.governor.is_open:
+            self._async_pause()
+            raise UpdateFailed(
+                f"Requests to {self.governor.host} are paused after repeated failures"
+            )
+
+        try:
+            with trace.phase("token"):
+                await self.tokens.async_get_token()
+        except EnergiinfoError as err:
+            self._async_pause()
+            raise UpdateFailed(
+                f"Status: {err.status} Error: {err.error_message}"
+            ) from err
+
+        # One limit for the whole account, however many meters and signals are
+        # backfilling. All signals of a meter are fetched in this cycle
+        semaphore = asyncio.Semaphore(self._parallelism)
+        with trace.phase("fetch"):
+            fetches = await asyncio.gather(
+                *(
+                    self._async_fetch_meter(
+                        semaphore, key, meter_id, signal, requests[key]
+                    )
+                    for key, (meter_id, signal, _) in meters.items()
+                )
+            )
+
+        results = dict(zip(requests, fetches))
+        for key, fetch in results.items():
+            trace.series.setdefault(key, {}).update(
+                rows=len(fetch.values or []),
+                status=fetch.status,
+                error_message=fetch.error_message,
+            )
+        self._async_schedule(requests, results)
+        self._async_record_first_update()
+        return results
+
+    @callback
+    def _async_record_first_update(self) -> None:
+        """Record the time from setup to the first values of new entries."""
+        now = time.monotonic()
+        for entry_id, timing in self.startup.items():
+            if timing.first_update_seconds is None:
+                timing.first_update_seconds = now - timing.started
+                _LOGGER.info(
+                    f"First update of {self._entries[entry_id].title} "
+                    f"{timing.first_update_seconds:.1f}s after setup"
+                )
+
+    @callback
+    def _async_schedule(
+        self, requests: dict[str, MeterRequest], results: dict[str, MeterFetch]
+    ) -> None:
+        """Set the interval until the next cycle from what this cycle returned."""
+        now = dtutil.now()
+        for key, fetch in results.items():
+            if fetch.status == "OK":
+                self._series_backoff.pop(key, None)
+                continue
+            delay = SERIES_RETRY_INTERVAL
+            if (backoff := self._series_backoff.get(key)) is not None:
+                delay = min(backoff[0] * 2, CAUGHT_UP_UPDATE_INTERVAL)
+            self._series_backoff[key] = (delay, now + delay)
+            _LOGGER.debug(f"Fetching {key} failed, asking for it again in {delay}")
+
+        self.scheduler.record_poll(
+            now,
+            {series_key: fetch.newest for series_key, fetch in results.items()},
+        )
+        self.sync_store.async_update_account(
+            account_id(self.account_key), scheduler=self.scheduler.as_dict()
+        )
+        # Failing series are backed off on their own and do not hold the
+        # account at the catching up interval
+        if all(
+            requests[key].caught_up
+            for key, fetch in results.items()
+            if fetch.status == "OK"
+        ):
+            self.update_interval = self.scheduler.next_interval(now)
+        else:
+            self.update_interval = UPDATE_INTERVAL
+        self._async_pause()
+        _LOGGER.debug(f"Next update in {self.update_interval}")
+
+    @callback
+    def _async_pause(self) -> None:
+        """Hold off the next cycle while requests to the host are paused."""
+        if self.governor.is_open:
+            self.update_interval = max(
+                self.update_interval or UPDATE_INTERVAL,
+                timedelta(seconds=self.governor.retry_after),
+            )
+
+    async def _async_fetch_meter(
+        self,
+        semaphore: asyncio.Semaphore,
+        key: str,
+        meter_id: str,
+        signal: str,
+        request: MeterRequest,
+    ) -> MeterFetch:
+        """Fetch the requested ranges of one series, using cached hours if possible."""
+        started = time.monotonic()
+        metrics = self.series_metrics.setdefault(key, SeriesMetrics())
+        coarse = await asyncio.gather(
+            *(
+                self._async_fetch_coarse(semaphore, meter_id, signal, *coarse_range)
+                for coarse_range in request.coarse
+            )
+        )
+
+        cached = []
+        ranges = []
+        for start, end in request.ranges:
+            rows = await self._cache.async_get_range(key, start, end)
+            cached.extend(rows)
+            ranges.extend(
+                missing_ranges({int(row["time"]) for row in rows}, start, end)
+            )
+        ranges = merge_ranges(ranges, MAX_MERGED_GAP)
+        _LOGGER.info(
+            f"Updating historical data for {key}: {len(cached)} hours cached, "
+            f"{len(ranges)} ranges to fetch"
+        )
+        fetched = await async_fetch_ranges(
+            self._async_get_period_values, semaphore, meter_id, ranges, signal
+        )
+        await self._cache.async_store(key, fetched.values)
+        recheck = await self._async_fetch_recheck(
+            semaphore, key, meter_id, signal, request.recheck
+        )
+        metrics.rows_fetched = (
+            len(fetched.values)
+            + sum(len(part.values or []) for part in coarse)
+            + len(recheck or [])
+        )
+        metrics.fetch_seconds = time.monotonic() - started
+        # Fetched rows replace cached ones of the same hour
+        rows = {row["time"]: row for row in (*cached, *fetched.values)}
+        values = [rows[time] for time in sorted(rows)]
+        # Only rows the API returned now tell when new values are published
+        newest = max((row["time"] for row in fetched.values), default=None)
+
+        if fetched.error is None:
+            return MeterFetch(
+                ranges=request.ranges,
+                values=values,
+                status="OK",
+                coarse=coarse,
+                recheck=recheck,
+                newest=newest,
+            )
+        # Nothing from the first failed chunk on may be imported
+        limit = hour_key(fetched.failed_at)
+        values = [row for row in values if int(row["time"]) < limit]
+        return MeterFetch(
+            ranges=request.ranges,
+            values=values or None,
+            status=fetched.error.status,
+            error_message=fetched.error.error_message,
+            failed_at=fetched.failed_at,
+            coarse=coarse,
+            recheck=recheck,
+            newest=newest,
+        )
+
+    async def _async_fetch_recheck(
+        self,
+        semaphore: asyncio.Semaphore,
+        key: str,
+        meter_id: str,
+        signal: str,
+        ranges: list[tuple[datetime, datetime]],
+    ) -> list[dict] | None:
+        """Fetch imported ranges again, the cache is updated with the values."""
+        if not ranges:
+            return None
+        fetched = await async_fetch_ranges(
+            self._async_get_period_values, semaphore, meter_id, ranges, signal
+        )
+        if fetched.error is not None:
+            _LOGGER.debug(
+                f"Fetching {key} again failed: {fetched.error.error_message}"
+            )
+            return None
+        await self._cache.async_store(key, fetched.values)
+        return fetched.values
+
+    async def _async_fetch_coarse(
+        self,
+        semaphore: asyncio.Semaphore,
+        meter_id: str,
+        signal: str,
+        start: datetime,
+        end: datetime,
+        interval: str,
+    ) -> CoarseFetch:
+        """Fetch one value per day or month of start..end (end exclusive)."""
+        fetched = await async_fetch_ranges(
+            self._async_get_period_values,
+            semaphore,
+            meter_id,
+            [(start, end - timedelta(hours=1))],
+            signal,
+            interval,
+            MAX_DAYS[interval],
+        )
+        if fetched.error is not None:
+            _LOGGER.debug(
+                f"Fetching {interval} values of {meter_id} from {start} failed: "
+                f"{fetched.error.error_message}"
+            )
+            return CoarseFetch(start, end, interval, None)
+        return CoarseFetch(start, end, interval, fetched.values)
+
+    async def _async_get_period_values(
+        self, meter_id: str, period: str, signal: str, interval: str
+    ) -> list[dict]:
+        """Fetch period values, logging in again once if access is denied."""
+        return await self.tokens.async_call(
+            self._client.async_get_period_values, meter_id, period, signal, interval
+        )
@@ -0,0 +1,70 @@
+"""Diagnostics support for the energiinfo integration."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+import re
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_PROFILER, CONF_STORED_TOKEN
+from .coordinator import EnergiinfoCoordinator
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME, CONF_STORED_TOKEN}
+
+# Request errors can contain the url, with the token in its query
+_TOKEN_IN_URL = re.compile(r"access_token=[^&\s'\"]+")
+
+
+def _redact_text(value: Any) -> Any:
+    """Remove access tokens from error messages."""
+    if isinstance(value, str):
+        return _TOKEN_IN_URL.sub("access_token=**REDACTED**", value)
+    if isinstance(value, dict):
+        return {key: _redact_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact_text(item) for item in value]
+    return value
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the state of the account and the latest poll traces."""
+    coordinator: EnergiinfoCoordinator = hass.data[DOMAIN][entry.entry_id]
+    profiler = hass.data[DOMAIN].get(DATA_PROFILER)
+    timing = coordinator.startup.get(entry.entry_id)
+
+    return _redact_text(
+        {
+            "entry": async_redact_data(dict(entry.data), TO_REDACT),
+            "account": {
+                "update_interval": coordinator.update_interval.total_seconds()
+                if coordinator.update_interval
+                else None,
+                "last_update_success": coordinator.last_update_success,
+                "token_refreshed": coordinator.tokens.refreshed.isoformat()
+                if coordinator.tokens.refreshed
+                else None,
+                "circuit_open": coordinator.governor.is_open,
+                "api_calls": coordinator.metrics.calls_total,
+                "api_bytes": coordinator.metrics.bytes_total,
+                "consecutive_failures": coordinator.metrics.consecutive_failures,
+                "publication_hours": sorted(coordinator.scheduler.publication_hours()),
+            },
+            "startup": asdict(timing) if timing is not None else None,
+            "series": {
+                key: asdict(metrics)
+                for key, metrics in coordinator.series_metrics.items()
+            },
+            "traces": [
+                {**asdict(trace), "started": trace.started.isoformat()}
+                for trace in coordinator.traces
+            ],
+            "profile": profiler.report if profiler is not None else None,
+        }
+    )
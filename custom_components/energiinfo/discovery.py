@@ -0,0 +1,63 @@
+"""Cached metering point discovery for the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dtutil
+
+from .const import DOMAIN, DATA_DISCOVERY, DISCOVERY_TTL
+
+if TYPE_CHECKING:
+    from .coordinator import AccountKey
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def async_get_discovery_cache(hass: HomeAssistant) -> MeteringPointCache:
+    """Return the metering point cache shared by the flows and coordinators."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (cache := domain_data.get(DATA_DISCOVERY)) is None:
+        cache = domain_data[DATA_DISCOVERY] = MeteringPointCache()
+    return cache
+
+
+class MeteringPointCache:
+    """Metering points per account (url, site_id, username).
+
+    Results younger than DISCOVERY_TTL are used without asking the API. Calls
+    for the same account wait for the one request in flight instead of
+    starting their own.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self._meters: dict[AccountKey, tuple[datetime, list[dict[str, Any]]]] = {}
+        self._locks: dict[AccountKey, asyncio.Lock] = {}
+
+    def get(self, key: AccountKey) -> list[dict[str, Any]] | None:
+        """Return the metering points of an account if they are fresh."""
+        if (cached := self._meters.get(key)) is None:
+            return None
+        fetched, meters = cached
+        return meters if dtutil.utcnow() - fetched < DISCOVERY_TTL else None
+
+    async def async_get(
+        self,
+        key: AccountKey,
+        fetch: Callable[[], Awaitable[list[dict[str, Any]]]],
+        refresh: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Return the metering points of an account, fetching them if needed."""
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if not refresh and (meters := self.get(key)) is not None:
+                return meters
+            meters = await fetch()
+            self._meters[key] = (dtutil.utcnow(), meters)
+            _LOGGER.debug(f"Discovered {len(meters)} metering points for {key[2]}")
+            return meters
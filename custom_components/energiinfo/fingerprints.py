@@ -0,0 +1,78 @@
+"""Per day fingerprints of imported values for the energiinfo integration."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import zlib
+
+from .intervals import hour_to_datetime
+from .series import HourlySeries
+
+
+def day_of(hour: int) -> str:
+    """Return the local day (YYYYMMDD) of the value labelled with hour."""
+    # The label is the end of the hour, the value belongs to the day it starts in
+    return hour_to_datetime(hour - 1).strftime("%Y%m%d")
+
+
+def iter_days(series: HourlySeries) -> Iterator[tuple[str, HourlySeries]]:
+    """Yield the local days of a series with their part of it, in order."""
+    start = 0
+    for index in range(1, len(series) + 1):
+        day = day_of(series.hours[index - 1])
+        if index == len(series) or day_of(series.hours[index]) != day:
+            yield day, series[start:index]
+            start = index
+
+
+def _checksum(hour: int, value: float) -> int:
+    return zlib.crc32(f"{hour}={value!r}".encode())
+
+
+class DayFingerprints:
+    """Number of hours and XOR of their checksums per local day.
+
+    The XOR does not depend on the order the hours of a day were imported in,
+    so the fingerprint of a day built hour by hour over several poll cycles
+    equals the one of the whole day fetched at once.
+    """
+
+    def __init__(self, days: dict[str, list[int]] | None = None) -> None:
+        """Initialize from the stored [hours, checksum] by day."""
+        self._days = {
+            day: list(fingerprint) for day, fingerprint in (days or {}).items()
+        }
+
+    @staticmethod
+    def _fingerprints(series: HourlySeries) -> dict[str, list[int]]:
+        fingerprints: dict[str, list[int]] = {}
+        for day, part in iter_days(series):
+            checksum = 0
+            for hour, value in zip(part.hours, part.values):
+                checksum ^= _checksum(hour, value)
+            fingerprints[day] = [len(part), checksum]
+        return fingerprints
+
+    def add(self, series: HourlySeries) -> None:
+        """Add newly imported hours, none of them may be in a fingerprint yet."""
+        for day, (hours, checksum) in self._fingerprints(series).items():
+            known = self._days.setdefault(day, [0, 0])
+            known[0] += hours
+            known[1] ^= checksum
+
+    def update(self, series: HourlySeries) -> list[str]:
+        """Replace the days of refetched hours, return the known days that changed."""
+        changed = []
+        for day, fingerprint in self._fingerprints(series).items():
+            if self._days.get(day, fingerprint) != fingerprint:
+                changed.append(day)
+            self._days[day] = fingerprint
+        return changed
+
+    def prune(self, first_day: str) -> None:
+        """Forget the days before first_day, they are not checked again."""
+        self._days = {day: fp for day, fp in self._days.items() if day >= first_day}
+
+    def as_dict(self) -> dict[str, list[int]]:
+        """Return the fingerprints in a JSON serializable form."""
+        return {day: list(fingerprint) for day, fingerprint in self._days.items()}
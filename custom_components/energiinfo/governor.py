@@ -0,0 +1,164 @@
+"""Per API host request governor for the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import random
+import time
+from typing import TypeVar
+from urllib.parse import urlsplit
+
+from homeassistant.core import HomeAssistant
+
+from .api import EnergiinfoConnectionError, EnergiinfoError
+from .const import (
+    DOMAIN,
+    DATA_GOVERNORS,
+    RATE_LIMIT,
+    RATE_LIMIT_BURST,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    RETRY_BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class EnergiinfoCircuitOpenError(EnergiinfoConnectionError):
+    """Error to indicate requests to the host are paused after repeated failures."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        """Initialize the error with the seconds until the host is tried again."""
+        super().__init__(
+            f"Requests to {host} paused for {retry_after:.0f}s after repeated failures"
+        )
+        self.retry_after = retry_after
+
+
+class RequestGovernor:
+    """Rate limit, retry and circuit breaker for all requests to one API host.
+
+    Requests take a token from a bucket refilled at RATE_LIMIT per second.
+    Connection errors are retried with jittered exponential backoff. After
+    CIRCUIT_FAILURE_THRESHOLD failed requests in a row the circuit opens and
+    requests fail right away until CIRCUIT_RESET_TIMEOUT passed, then one
+    request is let through to probe the host.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = RATE_LIMIT,
+        burst: int = RATE_LIMIT_BURST,
+    ) -> None:
+        """Initialize the governor with a full bucket and a closed circuit."""
+        self.host = host
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._bucket_lock = asyncio.Lock()
+        self._failures = 0
+        self._opened: float | None = None
+        self._probing = False
+
+    @property
+    def retry_after(self) -> float:
+        """Return the seconds until an open circuit lets a request through."""
+        if self._opened is None:
+            return 0.0
+        return max(0.0, self._opened + CIRCUIT_RESET_TIMEOUT - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if requests to the host are paused."""
+        return self._opened is not None and (self.retry_after > 0 or self._probing)
+
+    async def async_call(self, func: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a request, retrying connection errors with backoff."""
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                await self._async_acquire()
+                result = await func()
+            except EnergiinfoConnectionError as err:
+                self._record_failure()
+                attempt += 1
+                if attempt >= RETRY_ATTEMPTS or self._opened is not None:
+                    raise
+                delay = min(RETRY_BACKOFF * 2 ** (attempt - 1), RETRY_BACKOFF_MAX)
+                delay *= random.uniform(0.5, 1.5)
+                _LOGGER.debug(
+                    f"Request to {self.host} failed ({err.error_message}), "
+                    f"retry {attempt} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            except EnergiinfoError:
+                # The host answered, only the request was refused
+                self._record_success()
+                raise
+            except BaseException:
+                # Cancelled or failed before the host answered, allow a new probe
+                self._probing = False
+                raise
+            else:
+                self._record_success()
+                return result
+
+    def _check_circuit(self) -> None:
+        """Raise if the circuit is open, let one probe through once it may close."""
+        if self._opened is None:
+            return
+        if self.retry_after > 0 or self._probing:
+            raise EnergiinfoCircuitOpenError(self.host, self.retry_after)
+        self._probing = True
+
+    async def _async_acquire(self) -> None:
+        """Wait for a token from the bucket."""
+        async with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._refilled) * self._rate
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refilled = time.monotonic()
+                self._tokens = 1.0
+            self._tokens -= 1
+
+    def _record_success(self) -> None:
+        if self._opened is not None:
+            _LOGGER.info(f"Requests to {self.host} succeed again, resuming")
+        self._failures = 0
+        self._opened = None
+        self._probing = False
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self._opened is not None or self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+            if self._opened is None:
+                _LOGGER.warning(
+                    f"{self._failures} failed requests to {self.host}, pausing "
+                    f"requests for {CIRCUIT_RESET_TIMEOUT:.0f}s"
+                )
+            self._opened = time.monotonic()
+
+
+def async_get_governor(hass: HomeAssistant, api_url: str) -> RequestGovernor:
+    """Return the governor shared by all entries using the host of api_url."""
+    governors: dict[str, RequestGovernor] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault(DATA_GOVERNORS, {})
+    host = urlsplit(api_url).netloc or api_url
+    if (governor := governors.get(host)) is None:
+        governor = governors[host] = RequestGovernor(host)
+    return governor
@@ -0,0 +1,289 @@
+"""Statistics import helpers for the energiinfo integration."""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta
+import itertools
+import logging
+
+from homeassistant.components import recorder
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    async_import_statistics,
+    statistics_during_period,
+    valid_statistic_id,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dtutil
+
+from homeassistant_historical_sensor import HistoricalState
+
+from .series import HourlySeries
+
+_LOGGER = logging.getLogger(__name__)
+
+# How far back to look for the sum a filled gap continues from
+SUM_LOOKBACK = timedelta(days=31)
+# StatisticData objects built per chunk
+STATISTICS_CHUNK_SIZE = 1000
+# New states above this count are imported in bulk instead of one by one
+BULK_IMPORT_THRESHOLD = 168
+# Newest states still written through HistoricalSensor after a bulk import
+BULK_IMPORT_TAIL = 24
+
+
+def statistic_start(dt: datetime) -> datetime:
+    """Return the start of the statistic of a state at dt.
+
+    A state at a full hour is the consumption of the hour before it.
+    """
+    if dt.minute == 0 and dt.second == 0:
+        return dt - timedelta(hours=1)
+    return dt
+
+
+def iter_statistic_data(
+    hist_states: Sequence[HistoricalState],
+    accumulated: float,
+    chunk_size: int = STATISTICS_CHUNK_SIZE,
+) -> Iterator[list[StatisticData]]:
+    """Yield the StatisticData of hist_states in chunks of chunk_size.
+
+    The running sum continues from accumulated and is computed in one pass over
+    the values, the StatisticData objects are only built chunk by chunk.
+    """
+    values = array("d", [hist.state for hist in hist_states])
+    sums = array("d", itertools.accumulate(values, initial=accumulated))
+    for offset in range(0, len(values), chunk_size):
+        end = offset + chunk_size
+        yield [
+            StatisticData(
+                start=statistic_start(hist.dt), state=value, mean=value, sum=total
+            )
+            for hist, value, total in zip(
+                hist_states[offset:end], values[offset:end], sums[offset + 1 : end + 1]
+            )
+        ]
+
+
+def iter_mean_statistic_data(
+    hist_states: Sequence[HistoricalState],
+    chunk_size: int = STATISTICS_CHUNK_SIZE,
+) -> Iterator[list[StatisticData]]:
+    """Yield mean/min/max StatisticData of hist_states in chunks of chunk_size.
+
+    Every state is the only sample of its hour, so the three are the same.
+    """
+    for offset in range(0, len(hist_states), chunk_size):
+        yield [
+            StatisticData(
+                start=statistic_start(hist.dt),
+                mean=hist.state,
+                min=hist.state,
+                max=hist.state,
+            )
+            for hist in hist_states[offset : offset + chunk_size]
+        ]
+
+
+def iter_series_statistic_data(
+    series: HourlySeries,
+    accumulated: float,
+    has_sum: bool = True,
+    chunk_size: int = STATISTICS_CHUNK_SIZE,
+) -> Iterator[list[StatisticData]]:
+    """Yield the StatisticData of a series in chunks of chunk_size.
+
+    Same statistics as iter_statistic_data and iter_mean_statistic_data, built
+    from the arrays of the series without HistoricalState objects. accumulated
+    is only used with has_sum.
+    """
+    if has_sum:
+        sums = array("d", itertools.accumulate(series.values, initial=accumulated))
+    for offset in range(0, len(series), chunk_size):
+        end = offset + chunk_size
+        hours, values = series.hours[offset:end], series.values[offset:end]
+        if has_sum:
+            yield [
+                StatisticData(
+                    start=dtutil.utc_from_timestamp((hour - 1) * 3600),
+                    state=value,
+                    mean=value,
+                    sum=total,
+                )
+                for hour, value, total in zip(
+                    hours, values, sums[offset + 1 : end + 1]
+                )
+            ]
+        else:
+            yield [
+                StatisticData(
+                    start=dtutil.utc_from_timestamp((hour - 1) * 3600),
+                    mean=value,
+                    min=value,
+                    max=value,
+                )
+                for hour, value in zip(hours, values)
+            ]
+
+
+@callback
+def async_import(
+    hass: HomeAssistant, metadata: StatisticMetaData, stats: list[StatisticData]
+) -> None:
+    """Queue statistics for import the same way HistoricalSensor does."""
+    if valid_statistic_id(metadata["statistic_id"]):
+        async_add_external_statistics(hass, metadata, stats)
+    else:
+        async_import_statistics(hass, metadata, stats)
+
+
+async def async_bulk_import(
+    hass: HomeAssistant,
+    metadata: StatisticMetaData,
+    series: HourlySeries,
+    accumulated: float,
+) -> None:
+    """Import values after the latest statistic straight as statistics.
+
+    Unlike HistoricalSensor no state is written per hour, the statistics are
+    queued in batches of STATISTICS_CHUNK_SIZE and the function returns once
+    the recorder imported them.
+    """
+    for stats in iter_series_statistic_data(
+        series, accumulated, metadata["has_sum"]
+    ):
+        async_import(hass, metadata, stats)
+    await recorder.get_instance(hass).async_block_till_done()
+    _LOGGER.info(f"Bulk imported {len(series)} hours of {metadata['statistic_id']}")
+
+
+def _get_sums(
+    hass: HomeAssistant, statistic_id: str, start: datetime, end: datetime
+) -> dict[float, float]:
+    """Return the sum of every hourly statistic in start..end by start timestamp."""
+    stats = statistics_during_period(
+        hass, start, end, {statistic_id}, "hour", None, {"sum"}
+    )
+    return {
+        row["start"]: row.get("sum") or 0.0 for row in stats.get(statistic_id, [])
+    }
+
+
+async def async_fill_statistics(
+    hass: HomeAssistant,
+    metadata: StatisticMetaData,
+    hist_states: list[HistoricalState],
+) -> int:
+    """Import states for hours before the latest imported statistic.
+
+    HistoricalSensor only appends after its latest statistic. States for holes
+    before it are imported here: every run of states between two existing
+    statistics continues from the sum before it, and every later statistic is
+    raised by the total of the run. Statistics without a sum are imported as they are.
+    Hours that already have a statistic are skipped.
+    Returns the number of imported hours once the recorder imported them.
+    """
+    if not hist_states:
+        return 0
+    statistic_id = metadata["statistic_id"]
+    hist_states = sorted(hist_states, key=lambda hist: hist.dt)
+
+    first = statistic_start(hist_states[0].dt)
+    sums = await recorder.get_instance(hass).async_add_executor_job(
+        _get_sums, hass, statistic_id, first - SUM_LOOKBACK, hist_states[-1].dt
+    )
+    hist_states = [
+        hist
+        for hist in hist_states
+        if dtutil.as_timestamp(statistic_start(hist.dt)) not in sums
+    ]
+    if not metadata["has_sum"]:
+        for stats in iter_mean_statistic_data(hist_states):
+            async_import(hass, metadata, stats)
+        await recorder.get_instance(hass).async_block_till_done()
+        return len(hist_states)
+
+    # States with no existing statistic between them are imported as one run,
+    # whether their hours are consecutive or not
+    existing = sorted(sums.items())
+    starts = [start for start, _ in existing]
+    runs: list[tuple[int, list[HistoricalState]]] = []
+    for hist in hist_states:
+        index = bisect.bisect_left(
+            starts, dtutil.as_timestamp(statistic_start(hist.dt))
+        )
+        if runs and runs[-1][0] == index:
+            runs[-1][1].append(hist)
+        else:
+            runs.append((index, [hist]))
+
+    # The sums read above do not include the adjustments of earlier runs yet
+    offset = 0.0
+    for index, run in runs:
+        base = (existing[index - 1][1] if index else 0.0) + offset
+
+        for stats in iter_statistic_data(run, base):
+            async_import(hass, metadata, stats)
+        # Statistics after the run did not include it in their sum
+        recorder.get_instance(hass).async_adjust_statistics(
+            statistic_id,
+            run[-1].dt,
+            stats[-1]["sum"] - base,
+            metadata["unit_of_measurement"],
+        )
+        offset += stats[-1]["sum"] - base
+        _LOGGER.info(
+            f"Filled {len(run)} hours of {statistic_id} "
+            f"from {run[0].dt} to {run[-1].dt}"
+        )
+
+    await recorder.get_instance(hass).async_block_till_done()
+    return len(hist_states)
+
+
+async def async_replace_statistics(
+    hass: HomeAssistant, metadata: StatisticMetaData, series: HourlySeries
+) -> None:
+    """Import a series over the existing statistics of its hours.
+
+    The sums continue from the statistic before the first hour, every later
+    statistic is raised by the difference to the sum the replaced statistics
+    ended at. Returns once the recorder imported and adjusted them.
+    """
+    if not len(series):
+        return
+    statistic_id = metadata["statistic_id"]
+    first = dtutil.utc_from_timestamp((series.hours[0] - 1) * 3600)
+    # The hour after the last statistic of the series
+    after = dtutil.utc_from_timestamp(series.hours[-1] * 3600)
+
+    base = replaced = 0.0
+    if metadata["has_sum"]:
+        sums = await recorder.get_instance(hass).async_add_executor_job(
+            _get_sums, hass, statistic_id, first - SUM_LOOKBACK, after
+        )
+        existing = sorted(sums.items())
+        starts = [start for start, _ in existing]
+        if before := bisect.bisect_left(starts, first.timestamp()):
+            base = existing[before - 1][1]
+        if through := bisect.bisect_right(starts, after.timestamp() - 3600):
+            replaced = existing[through - 1][1]
+
+    for stats in iter_series_statistic_data(series, base, metadata["has_sum"]):
+        async_import(hass, metadata, stats)
+    if metadata["has_sum"]:
+        # Statistics after the series still continue from the replaced sum
+        if difference := base + sum(series.values) - replaced:
+            recorder.get_instance(hass).async_adjust_statistics(
+                statistic_id,
+                after,
+                difference,
+                metadata["unit_of_measurement"],
+            )
+    await recorder.get_instance(hass).async_block_till_done()
+    _LOGGER.info(f"Replaced {len(series)} hours of {statistic_id} from {first}")
@@ -0,0 +1,130 @@
+"""Hour numbers and covered hour intervals for the energiinfo integration."""
+
+from __future__ import annotations
+
+import bisect
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from homeassistant.util import dt as dtutil
+
+
+def hour_of(dt: datetime) -> int:
+    """Return the hour number (hours since the epoch) of the hour dt is in."""
+    return int(dt.timestamp()) // 3600
+
+
+def hour_of_time(time: str) -> int:
+    """Return the hour number of a `YYYYMMDDHH` time returned by the API."""
+    return hour_of(dtutil.as_local(datetime.strptime(time, "%Y%m%d%H")))
+
+
+def _day_start_hour(day: int) -> int | None:
+    """Return the hour number of local midnight of a `YYYYMMDD` day.
+
+    Returns None for days that are not 24 hours long (DST changes), the hours
+    of those days can not be counted from midnight.
+    """
+    year, month_day = divmod(day, 10000)
+    midnight = datetime(year, *divmod(month_day, 100))
+    start = hour_of(dtutil.as_local(midnight))
+    end = hour_of(dtutil.as_local(midnight + timedelta(days=1)))
+    return start if end - start == 24 else None
+
+
+def hours_of_times(times: Iterable[str]) -> list[int]:
+    """Return the hour numbers of many `YYYYMMDDHH` times.
+
+    The hours of a day are counted from its midnight, which is only looked up
+    once per day. Days with a DST change fall back to `hour_of_time`.
+    """
+    day_starts: dict[int, int | None] = {}
+    hours = []
+    for time in times:
+        day, hour = divmod(int(time), 100)
+        if day not in day_starts:
+            day_starts[day] = _day_start_hour(day)
+        if (start := day_starts[day]) is not None:
+            hours.append(start + hour)
+        else:
+            hours.append(hour_of_time(time))
+    return hours
+
+
+def period_start(time: str, interval: str) -> datetime:
+    """Return the local start of the day or month of a time returned by the API."""
+    if interval == "month":
+        return dtutil.as_local(datetime.strptime(time[:6], "%Y%m"))
+    return dtutil.as_local(datetime.strptime(time[:8], "%Y%m%d"))
+
+
+def hour_to_datetime(hour: int) -> datetime:
+    """Return the local datetime an hour number starts at."""
+    return dtutil.as_local(dtutil.utc_from_timestamp(hour * 3600))
+
+
+class HourIntervals:
+    """Sorted set of disjoint, half open [start, end) hour number intervals."""
+
+    def __init__(self, intervals: Iterable[Iterable[int]] = ()) -> None:
+        """Initialize the set, overlapping and adjacent intervals are merged."""
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __contains__(self, hour: int) -> bool:
+        """Return True if the hour is in one of the intervals."""
+        index = bisect.bisect_right(self._starts, hour) - 1
+        return index >= 0 and hour < self._ends[index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HourIntervals):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __iter__(self):
+        """Iterate over the (start, end) intervals in order."""
+        return zip(self._starts, self._ends)
+
+    @property
+    def last(self) -> int | None:
+        """Return the last hour in the set."""
+        return self._ends[-1] - 1 if self._ends else None
+
+    def add(self, start: int, end: int) -> None:
+        """Add the hours start..end-1."""
+        if start >= end:
+            return
+        # Intervals touching or overlapping [start, end) are merged into it
+        low = bisect.bisect_left(self._ends, start)
+        high = bisect.bisect_right(self._starts, end)
+        if low < high:
+            start = min(start, self._starts[low])
+            end = max(end, self._ends[high - 1])
+        self._starts[low:high] = [start]
+        self._ends[low:high] = [end]
+
+    def add_hours(self, hours: Iterable[int]) -> None:
+        """Add single hours."""
+        for hour in sorted(hours):
+            self.add(hour, hour + 1)
+
+    def missing(self, start: int, end: int) -> list[tuple[int, int]]:
+        """Return the [start, end) intervals between start and end not in the set."""
+        gaps = []
+        for covered_start, covered_end in self:
+            if covered_end <= start:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > start:
+                gaps.append((start, covered_start))
+            start = max(start, covered_end)
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    def as_list(self) -> list[list[int]]:
+        """Return the intervals in a JSON serializable form."""
+        return [[start, end] for start, end in self]
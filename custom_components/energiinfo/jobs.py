@@ -0,0 +1,57 @@
+"""Background backfill jobs of the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class BackfillJob:
+    """Progress of re-importing start..end of one series.
+
+    `ranges` are the [start, end) hour numbers to fetch, hours that are
+    imported as day or month values are left out.
+    """
+
+    start: datetime
+    end: datetime
+    ranges: list[tuple[int, int]]
+    hours_done: int = 0
+    status: str = STATUS_RUNNING
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def hours_total(self) -> int:
+        """Return the number of hours the job fetches."""
+        return sum(end - start for start, end in self.ranges)
+
+    @property
+    def running(self) -> bool:
+        """Return True until the job finished, failed or was cancelled."""
+        return self.status == STATUS_RUNNING
+
+    def cancel(self) -> bool:
+        """Cancel the task of the job, return False if it was not running."""
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+    def as_dict(self) -> dict:
+        """Return the progress as a state attribute."""
+        return {
+            "status": self.status,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "hours_done": self.hours_done,
+            "hours_total": self.hours_total,
+            "error": self.error,
+        }
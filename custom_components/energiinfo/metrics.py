@@ -0,0 +1,54 @@
+"""Timing and health instrumentation for the energiinfo integration."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+import time
+
+# Window the API call rate is counted over, in seconds
+CALL_RATE_WINDOW = 3600
+
+
+@dataclass
+class SeriesMetrics:
+    """Figures of the latest poll cycle of one meter signal."""
+
+    rows_fetched: int = 0
+    fetch_seconds: float | None = None
+    hours_remaining: int | None = None
+    statistics_seconds: float | None = None
+
+
+class ApiMetrics:
+    """Latency, rate and failures of the API calls of one account."""
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.last_latency: float | None = None
+        self.consecutive_failures = 0
+        self.calls_total = 0
+        self.bytes_total = 0
+        self._calls: deque[float] = deque()
+
+    def record_call(
+        self, command: str, seconds: float, ok: bool, size: int = 0
+    ) -> None:
+        """Record a finished API call and the size of its response body."""
+        now = time.monotonic()
+        self.calls_total += 1
+        self.bytes_total += size
+        self.last_latency = seconds
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        self._calls.append(now)
+        self._expire(now)
+
+    @property
+    def calls_last_hour(self) -> int:
+        """Return the number of API calls in the last hour."""
+        self._expire(time.monotonic())
+        return len(self._calls)
+
+    def _expire(self, now: float) -> None:
+        while self._calls and self._calls[0] < now - CALL_RATE_WINDOW:
+            self._calls.popleft()
@@ -0,0 +1,137 @@
+"""Hourly price series for the cost statistics of the energiinfo integration."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import csv
+from datetime import datetime, timedelta
+import logging
+import os
+
+from homeassistant.components import recorder
+from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dtutil
+
+from .const import CONF_PRICE_ENTITY, CONF_PRICE_FILE
+from .intervals import hour_of, hour_to_datetime
+from .series import HourlySeries
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def cost_series(energy: HourlySeries, prices: dict[int, float]) -> HourlySeries:
+    """Return the cost of the hours of an energy series that have a price."""
+    cost = HourlySeries()
+    for hour, value in zip(energy.hours, energy.values):
+        if (price := prices.get(hour)) is not None:
+            cost.hours.append(hour)
+            cost.values.append(value * price)
+    return cost
+
+
+class PriceSource(ABC):
+    """Hourly prices per kWh, by the hour number of the end of the hour."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the source."""
+        self._hass = hass
+
+    @property
+    def currency(self) -> str:
+        """Return the unit of the cost statistics."""
+        return self._hass.config.currency
+
+    @abstractmethod
+    async def async_get_prices(self, start: int, end: int) -> dict[int, float]:
+        """Return the prices of the hours start..end, inclusive."""
+
+
+class FilePrices(PriceSource):
+    """Prices from a CSV file of `time,price` rows.
+
+    `time` is the start of the hour in ISO 8601, in local time unless it has
+    an offset. Rows that do not parse, like a header, are skipped. The file is
+    read again when it changed.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the source for a path relative to the configuration."""
+        super().__init__(hass)
+        self._path = hass.config.path(path)
+        self._mtime: float | None = None
+        self._prices: dict[int, float] = {}
+
+    def _load(self) -> dict[int, float]:
+        try:
+            mtime = os.path.getmtime(self._path)
+            if mtime == self._mtime:
+                return self._prices
+            with open(self._path, encoding="utf-8", newline="") as file:
+                prices = {}
+                for row in csv.reader(file):
+                    try:
+                        start = datetime.fromisoformat(row[0].strip())
+                        price = float(row[1])
+                    except (IndexError, ValueError):
+                        continue
+                    if start.tzinfo is None:
+                        start = start.replace(tzinfo=dtutil.DEFAULT_TIME_ZONE)
+                    prices[hour_of(start) + 1] = price
+        except OSError as err:
+            _LOGGER.warning(f"Reading prices from {self._path} failed: {err}")
+            return self._prices
+        self._mtime, self._prices = mtime, prices
+        _LOGGER.debug(f"Read {len(prices)} prices from {self._path}")
+        return prices
+
+    async def async_get_prices(self, start: int, end: int) -> dict[int, float]:
+        """Return the prices of the hours start..end from the file."""
+        prices = await self._hass.async_add_executor_job(self._load)
+        return {hour: price for hour, price in prices.items() if start <= hour <= end}
+
+
+class EntityPrices(PriceSource):
+    """Prices from the hourly mean statistics of a price sensor."""
+
+    def __init__(self, hass: HomeAssistant, entity_id: str) -> None:
+        """Initialize the source for a sensor with long term statistics."""
+        super().__init__(hass)
+        self._entity_id = entity_id
+
+    @property
+    def currency(self) -> str:
+        """Return the currency of the sensor's unit, like SEK of SEK/kWh."""
+        if (state := self._hass.states.get(self._entity_id)) is not None and (
+            unit := state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        ):
+            return unit.split("/")[0]
+        return super().currency
+
+    async def async_get_prices(self, start: int, end: int) -> dict[int, float]:
+        """Return the prices of the hours start..end in one statistics query."""
+        stats = await recorder.get_instance(self._hass).async_add_executor_job(
+            statistics_during_period,
+            self._hass,
+            hour_to_datetime(start) - timedelta(hours=1),
+            hour_to_datetime(end),
+            {self._entity_id},
+            "hour",
+            None,
+            {"mean"},
+        )
+        return {
+            int(row["start"]) // 3600 + 1: row["mean"]
+            for row in stats.get(self._entity_id, [])
+            if row.get("mean") is not None
+        }
+
+
+def async_get_price_source(hass: HomeAssistant, data: dict) -> PriceSource | None:
+    """Return the price source configured in a config entry, if any."""
+    if entity_id := data.get(CONF_PRICE_ENTITY):
+        return EntityPrices(hass, entity_id)
+    if path := data.get(CONF_PRICE_FILE):
+        return FilePrices(hass, path)
+    return None
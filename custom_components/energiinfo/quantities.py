@@ -0,0 +1,64 @@
+"""Quantities the energiinfo integration can import for a meter."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import UnitOfEnergy, UnitOfPower
+
+from .const import SIGNAL_ACTIVE_ENERGY
+
+
+@dataclass(frozen=True)
+class Quantity:
+    """A signal of a meter imported as its own historical sensor.
+
+    Quantities with a sum are imported as a running total like the energy
+    sensor, the others as the mean, min and max of every hour.
+    """
+
+    key: str
+    signal: str
+    name: str | None
+    unit: str
+    device_class: SensorDeviceClass | None
+    has_sum: bool = True
+
+
+ENERGY = "energy"
+
+QUANTITIES: dict[str, Quantity] = {
+    quantity.key: quantity
+    for quantity in (
+        Quantity(
+            ENERGY,
+            SIGNAL_ACTIVE_ENERGY,
+            None,
+            UnitOfEnergy.KILO_WATT_HOUR,
+            SensorDeviceClass.ENERGY,
+        ),
+        Quantity(
+            "returned_energy",
+            "ActiveEnergyOut",
+            "Returned energy",
+            UnitOfEnergy.KILO_WATT_HOUR,
+            SensorDeviceClass.ENERGY,
+        ),
+        Quantity(
+            "reactive_energy",
+            "ReactiveEnergy",
+            "Reactive energy",
+            "kvarh",
+            None,
+        ),
+        Quantity(
+            "peak_power",
+            "ActivePower",
+            "Peak power",
+            UnitOfPower.KILO_WATT,
+            SensorDeviceClass.POWER,
+            has_sum=False,
+        ),
+    )
+}
@@ -0,0 +1,83 @@
+"""Daily and monthly rollups and peak hours for the energiinfo integration."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import heapq
+import itertools
+
+from .fingerprints import iter_days
+from .series import HourlySeries
+
+# Highest hours kept per month, effect tariffs use the mean of a few of them
+PEAK_HOURS = 3
+
+
+def latest(totals: dict[str, float], count: int) -> dict[str, float]:
+    """Return the latest count days or months of daily or monthly totals."""
+    return {key: totals[key] for key in sorted(totals)[-count:]}
+
+
+class Rollups:
+    """Totals per local day and month and the highest hours of every month.
+
+    New hours are added as they are imported, the totals never have to be
+    built from the hourly statistics again. Months with hours that were
+    imported again are rebuilt from all of their hours.
+    """
+
+    def __init__(self, data: dict | None = None) -> None:
+        """Initialize from the stored rollups."""
+        data = data or {}
+        self.daily: dict[str, float] = dict(data.get("daily", {}))
+        self.monthly: dict[str, float] = dict(data.get("monthly", {}))
+        # [hour, value] of the highest hours, highest first
+        self.peaks: dict[str, list[list[float]]] = {
+            month: [list(peak) for peak in peaks]
+            for month, peaks in data.get("peaks", {}).items()
+        }
+
+    def add(self, series: HourlySeries) -> None:
+        """Add hours that were not in the rollups before."""
+        for day, part in iter_days(series):
+            total = sum(part.values)
+            self.daily[day] = self.daily.get(day, 0.0) + total
+            self.monthly[day[:6]] = self.monthly.get(day[:6], 0.0) + total
+            self._add_peaks(day[:6], part)
+
+    def add_period(self, start: datetime, interval: str, value: float) -> None:
+        """Add the value of a whole day or month imported as one value."""
+        if interval == "day":
+            day = start.strftime("%Y%m%d")
+            self.daily[day] = self.daily.get(day, 0.0) + value
+        month = start.strftime("%Y%m")
+        self.monthly[month] = self.monthly.get(month, 0.0) + value
+
+    def replace_months(self, series: HourlySeries) -> None:
+        """Rebuild the months of a series, which holds all of their hours."""
+        for month, days in itertools.groupby(
+            iter_days(series), lambda item: item[0][:6]
+        ):
+            self.peaks[month] = []
+            for day, part in days:
+                self.daily[day] = sum(part.values)
+                self._add_peaks(month, part)
+            # Days imported as one value are in the daily totals as well
+            self.monthly[month] = sum(
+                total for day, total in self.daily.items() if day[:6] == month
+            )
+
+    def _add_peaks(self, month: str, part: HourlySeries) -> None:
+        candidates = itertools.chain(
+            self.peaks.get(month, []), zip(part.hours, part.values)
+        )
+        self.peaks[month] = [
+            [hour, value]
+            for hour, value in heapq.nlargest(
+                PEAK_HOURS, candidates, key=lambda peak: peak[1]
+            )
+        ]
+
+    def as_dict(self) -> dict:
+        """Return the rollups in a JSON serializable form."""
+        return {"daily": self.daily, "monthly": self.monthly, "peaks": self.peaks}
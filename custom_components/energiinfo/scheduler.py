@@ -0,0 +1,119 @@
+"""Adaptive poll scheduling for the energiinfo integration."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import random
+
+from .const import (
+    CAUGHT_UP_UPDATE_INTERVAL,
+    DENSE_UPDATE_INTERVAL,
+    BACKOFF_UPDATE_INTERVAL,
+    UPDATE_INTERVAL_JITTER,
+)
+
+HOURS_PER_DAY = 24
+# Older arrivals fade out so a changed publication routine is picked up
+ARRIVAL_DECAY = 0.9
+# Arrivals needed before the learned window is trusted
+MIN_ARRIVALS = 3.0
+# Share of the arrivals an hour needs to be part of the publication window
+WINDOW_SHARE = 0.2
+
+
+class PublicationScheduler:
+    """Learn when meters publish new hours and plan the next poll from it.
+
+    Hourly values are published in batches, typically once or twice a day. The
+    scheduler remembers at which local hour of day the newest returned
+    timestamp of each meter moved forward, polls every DENSE_UPDATE_INTERVAL
+    during those hours and backs off exponentially while polls return nothing
+    new, without sleeping past the start of the next window.
+    """
+
+    def __init__(self, data: dict | None = None) -> None:
+        """Initialize from the stored state, or empty."""
+        data = data or {}
+        self._arrivals: dict[str, list[float]] = {
+            meter_id: list(weights)
+            for meter_id, weights in data.get("arrivals", {}).items()
+        }
+        self._newest: dict[str, str] = dict(data.get("newest", {}))
+        self._empty_polls: int = data.get("empty_polls", 0)
+
+    def record_poll(self, now: datetime, newest: dict[str, str | None]) -> None:
+        """Record the newest `YYYYMMDDHH` time each meter returned in a poll."""
+        new_data = False
+        for meter_id, time in newest.items():
+            if time is None:
+                continue
+            previous = self._newest.get(meter_id)
+            if previous is None:
+                # Nothing to compare with yet, start from the shortest backoff
+                new_data = True
+                self._newest[meter_id] = time
+            elif time > previous:
+                new_data = True
+                self._newest[meter_id] = time
+                self._record_arrival(meter_id, now.hour)
+
+        self._empty_polls = 0 if new_data else self._empty_polls + 1
+
+    def _record_arrival(self, meter_id: str, hour: int) -> None:
+        """Add an arrival at the local hour of day."""
+        weights = self._arrivals.setdefault(meter_id, [0.0] * HOURS_PER_DAY)
+        for index, weight in enumerate(weights):
+            weights[index] = weight * ARRIVAL_DECAY
+        weights[hour] += 1.0
+
+    def publication_hours(self) -> set[int]:
+        """Return the local hours of day in which new values usually show up."""
+        hours = set()
+        for weights in self._arrivals.values():
+            total = sum(weights)
+            if total < MIN_ARRIVALS:
+                continue
+            hours.update(
+                hour
+                for hour, weight in enumerate(weights)
+                if weight >= total * WINDOW_SHARE
+            )
+        return hours
+
+    def next_interval(self, now: datetime) -> timedelta:
+        """Return the time until the next poll."""
+        hours = self.publication_hours()
+        if now.hour in hours:
+            interval = DENSE_UPDATE_INTERVAL
+        else:
+            interval = min(
+                BACKOFF_UPDATE_INTERVAL * 2**self._empty_polls,
+                CAUGHT_UP_UPDATE_INTERVAL,
+            )
+            if hours:
+                interval = max(
+                    min(interval, _until_next_window(now, hours)),
+                    DENSE_UPDATE_INTERVAL,
+                )
+
+        # Spread the polls of different accounts instead of hitting the API at once
+        jitter = random.uniform(-UPDATE_INTERVAL_JITTER, UPDATE_INTERVAL_JITTER)
+        return interval * (1 + jitter)
+
+    def as_dict(self) -> dict:
+        """Return the learned window and backoff in a JSON serializable form."""
+        return {
+            "arrivals": self._arrivals,
+            "newest": self._newest,
+            "empty_polls": self._empty_polls,
+        }
+
+
+def _until_next_window(now: datetime, hours: set[int]) -> timedelta:
+    """Return the time until the next full hour that is in hours."""
+    hour_start = now.replace(minute=0, second=0, microsecond=0)
+    for offset in range(1, HOURS_PER_DAY + 1):
+        start = hour_start + timedelta(hours=offset)
+        if start.hour in hours:
+            return start - now
+    return CAUGHT_UP_UPDATE_INTERVAL
@@ -1,47 +1,105 @@
+import asyncio
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
 import itertools
 import statistics
 from datetime import datetime, timedelta
-import pytz
 
 import logging
+import time
 
 from .const import (
     DOMAIN,
-    CONF_URL,
-    CONF_METERID,
-    CONF_STORED_TOKEN,
+    DATA_PROFILER,
     CONF_DAYS_BACK,
     CONF_LAST_UPDATE,
-    CONF_MAX_DAYS_BACK,
+    CONF_QUANTITIES,
+    CONF_COVERED,
+    CONF_COARSE,
+    CONF_FINGERPRINTS,
+    CONF_COST_COVERED,
+    CONF_ROLLUPS,
+    CONF_HOURLY_DAYS,
+    DEFAULT_HOURLY_DAYS,
+    BACKFILL_JOB_PARALLELISM,
+    MONTHLY_AFTER_DAYS,
+    MAX_MERGED_GAP,
+    LATE_DATA_WINDOW,
+    CORRECTION_WINDOW,
+    CORRECTION_CHECK_INTERVAL,
+)
+from .api import EnergiinfoError
+from .backfill import merge_ranges, split_range, split_resolution
+from .coordinator import (
+    EnergiinfoCoordinator,
+    MeterFetch,
+    MeterRequest,
+    entry_meters,
+    series_id,
+)
+from .importer import (
+    BULK_IMPORT_THRESHOLD,
+    BULK_IMPORT_TAIL,
+    async_bulk_import,
+    async_fill_statistics,
+    async_replace_statistics,
+    iter_mean_statistic_data,
+    iter_statistic_data,
+)
+from .fingerprints import DayFingerprints, day_of, iter_days
+from .jobs import STATUS_CANCELLED, STATUS_DONE, STATUS_FAILED, BackfillJob
+from .prices import PriceSource, async_get_price_source, cost_series
+from .rollups import Rollups, latest
+from .quantities import ENERGY, QUANTITIES, Quantity
+from .series import HourlySeries
+from .metrics import SeriesMetrics
+from .trace import UpdateProfiler
+from .intervals import (
+    HourIntervals,
+    hour_of,
+    hour_to_datetime,
+    period_start,
 )
-from energiinfo.api import EnergiinfoClient
 from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    ATTR_UNIT_OF_MEASUREMENT,
+    EntityCategory,
     UnitOfEnergy,
-    CONF_PASSWORD,
-    CONF_USERNAME,
+    UnitOfPower,
+    UnitOfTime,
+)
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
 )
-from homeassistant.helpers.entity import Entity, generate_entity_id
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import track_time_interval
-from homeassistant.helpers.typing import DiscoveryInfoType
-from homeassistant.util import dt as dtutil
-
-from homeassistant.components.sensor import ENTITY_ID_FORMAT
+from homeassistant.helpers.typing import DiscoveryInfoType, StateType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dtutil, slugify
 
 from homeassistant_historical_sensor import (
     HistoricalSensor,
     HistoricalState,
-    PollUpdateMixin,
 )
+from homeassistant_historical_sensor.recorderutil import get_last_statistics_wrapper
 
 
 _LOGGER = logging.getLogger(__name__)
 
+# Sent with the series id when the rollups of a series changed
+SIGNAL_ROLLUPS_UPDATED = f"{DOMAIN}_rollups_updated_{{}}"
+# Days and months of totals in the attributes of the rollup sensors
+ROLLUP_ATTRIBUTE_DAYS = 31
+ROLLUP_ATTRIBUTE_MONTHS = 24
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -52,97 +110,159 @@ async def async_setup_entry(
     """Set up the energy sensors."""
     _LOGGER.debug(f"Setting up Energiinfo sensor {config_entry.data}")
 
-    energiinfo_client = hass.data[DOMAIN][config_entry.entry_id]
-    # Check if token is still valid
-    token = config_entry.data[CONF_STORED_TOKEN]
-    if token is not None:
-        await hass.async_add_executor_job(energiinfo_client.authenticateToken, token)
-        status = energiinfo_client.getStatus()
-        if status == "OK":
-            _LOGGER.debug(f"Token verified OK")
-        else:
-            _LOGGER.debug(f"Access denied for Token. Will try and authenticate again")
-            token = await hass.async_add_executor_job(
-                energiinfo_client.authenticate,
-                config_entry.data[CONF_USERNAME],
-                config_entry.data[CONF_PASSWORD],
-            )
-            user_input = {CONF_STORED_TOKEN: token}
-            # Update token
-            user_input = {**config_entry.data, **user_input}
-            hass.config_entries.async_update_entry(config_entry, data=user_input)
+    # The account coordinator takes care of the token
+    coordinator: EnergiinfoCoordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    # Add the meter received
+    # Add a sensor per meter of the entry, their sync state lives in the sync
+    # store. Entries from before the store still have it in their data
     last_update = config_entry.data.get(
         CONF_LAST_UPDATE
     )  # Get CONF_LAST_UPDATE, return None if not found
-    _LOGGER.debug(f"token={token},last_update={last_update}")
+    _LOGGER.debug(f"last_update={last_update}")
 
+    # Every selected quantity of a meter is its own sensor, they are fetched
+    # in the same coordinator cycle
+    quantities = [
+        QUANTITIES[key] for key in config_entry.data.get(CONF_QUANTITIES, [ENERGY])
+    ]
+    # The energy sensors import the cost next to the energy if prices are set
+    prices = async_get_price_source(hass, config_entry.data)
     entities = []
-    entities.append(
-        EnergiinfoHistorySensor(
-            energiinfo_client,
-            config_entry.data["meter_id"],
-            config_entry.data["alias"],
-            config_entry.data[CONF_PASSWORD],
-            config_entry.data[CONF_USERNAME],
-            config_entry.data[CONF_DAYS_BACK],
-            last_update
-            if last_update is not None
-            else None,  # Assign None if last_update is None
+    for meter_id, meter_alias in entry_meters(config_entry.data).items():
+        for quantity in quantities:
+            rollups = None
+            if quantity.key == ENERGY:
+                meter_state = coordinator.sync_store.meter(meter_id)
+                covered = meter_state.get(
+                    CONF_COVERED, config_entry.data.get(CONF_COVERED)
+                )
+                entry_last_update = last_update
+                # Daily and monthly energy and the peak hours of the meter
+                rollups = Rollups(meter_state.get(CONF_ROLLUPS))
+                entities.extend(
+                    EnergiinfoRollupSensor(
+                        rollups, description, meter_id, meter_alias
+                    )
+                    for description in ROLLUP_SENSORS
+                )
+            else:
+                meter_state = coordinator.sync_store.meter(
+                    series_id(meter_id, quantity.signal)
+                )
+                covered = meter_state.get(CONF_COVERED)
+                entry_last_update = None
+            entities.append(
+                EnergiinfoHistorySensor(
+                    coordinator,
+                    meter_id,
+                    meter_alias,
+                    config_entry.data[CONF_DAYS_BACK],
+                    entry_last_update
+                    if entry_last_update is not None
+                    else None,  # Assign None if last_update is None
+                    covered,
+                    quantity,
+                    coarse=meter_state.get(CONF_COARSE),
+                    fingerprints=meter_state.get(CONF_FINGERPRINTS),
+                    prices=prices if quantity.key == ENERGY else None,
+                    cost_covered=meter_state.get(CONF_COST_COVERED),
+                    rollups=rollups,
+                    hourly_days=config_entry.data.get(
+                        CONF_HOURLY_DAYS, DEFAULT_HOURLY_DAYS
+                    ),
+                )
+            )
+
+    # Diagnostics of the account the entry uses and of every meter in it
+    entities.extend(
+        EnergiinfoDiagnosticSensor(
+            coordinator, description, config_entry.entry_id, config_entry.title
         )
+        for description in ACCOUNT_DIAGNOSTICS
+    )
+    entities.extend(
+        EnergiinfoDiagnosticSensor(coordinator, description, meter_id, meter_alias)
+        for meter_id, meter_alias in entry_meters(config_entry.data).items()
+        for description in METER_DIAGNOSTICS
     )
 
     async_add_entities(entities)
 
 
-class EnergiinfoHistorySensor(PollUpdateMixin, HistoricalSensor, SensorEntity):
+class EnergiinfoHistorySensor(
+    CoordinatorEntity[EnergiinfoCoordinator], HistoricalSensor, SensorEntity
+):
     """Representation of an energiinfo sensor."""
 
     #
     # Base clases:
     # - SensorEntity: This is a sensor, obvious
     # - HistoricalSensor: This sensor implements historical sensor methods
-    # - PollUpdateMixin: Historical sensors disable poll, this mixing
-    #                    reenables poll only for historical states and not for
-    #                    present state
+    # - CoordinatorEntity: Historical sensors disable poll, the account
+    #                      coordinator fetches the historical states for all
+    #                      meters of the account and notifies the sensors
     #
-    UPDATE_INTERVAL: timedelta = timedelta(minutes=1)
 
     def __init__(
         self,
-        energiinfo_client: EnergiinfoClient,
+        coordinator: EnergiinfoCoordinator,
         meter_id: str,
         meter_alias: str,
-        password: str,
-        username: str,
         days_back: int,
         last_update: str,
+        covered: list[list[int]] | None = None,
+        quantity: Quantity = QUANTITIES[ENERGY],
+        *,
+        coarse: list[list[int]] | None = None,
+        hourly_days: int = DEFAULT_HOURLY_DAYS,
+        fingerprints: dict[str, list[int]] | None = None,
+        prices: PriceSource | None = None,
+        cost_covered: list[list[int]] | None = None,
+        rollups: Rollups | None = None,
     ):
-        """Initialize the energy sensor."""
+        """Initialize the sensor for a quantity of a meter."""
+        super().__init__(coordinator)
+        self._attr_historical_states = []
         self._meter_alias = meter_alias
         self._meter_id = meter_id
-        self._unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-        self._energiinfo_client = energiinfo_client
-        self._username = username
-        self._password = password
+        self._quantity = quantity
+        self._series_id = series_id(meter_id, quantity.signal)
+        self._unit_of_measurement = quantity.unit
+        self._attr_device_class = quantity.device_class
         self._days_back = days_back
-        self._timzeone = pytz.timezone("CET")  # Get the timezone object for CET
+        self._hourly_days = hourly_days
+        # Backfill jobs import between the poll cycles, never during one
+        self._statistics_lock = asyncio.Lock()
 
+        # Hours already fetched and imported, holes in it are fetched again
         _LOGGER.info(f"last_update={last_update}")
-        if last_update is not None:
-            self._last_update = datetime.fromisoformat(
-                str(last_update)
-            )  # Convert string to datetime object
+        if covered is not None:
+            self._covered = HourIntervals(covered)
+        elif last_update is not None:
+            # Entries from before the index trusted everything up to last_update
+            last_hour = hour_of(datetime.fromisoformat(str(last_update)))
+            self._covered = HourIntervals([[self._first_hour(), last_hour + 1]])
         else:
-            self._last_update = None
+            self._covered = HourIntervals()
+        # Hours imported as part of a day or month value
+        self._coarse = HourIntervals(coarse or ())
+        # Fingerprints of the days in the correction window, and when the
+        # window was fetched again last
+        self._fingerprints = DayFingerprints(fingerprints)
+        self._last_recheck: datetime | None = None
+        # Nothing is requested until the index was compared with the recorder
+        self._resumed = False
+        # Hours the cost statistic was imported for, or gave up on
+        self._prices = prices
+        self._cost_covered = HourIntervals(cost_covered or ())
+        self._rollups = rollups
 
         # A unique_id for this entity with in this domain. This means for example if you
         # have a sensor on this cover, you must ensure the value returned is unique,
         # which is done here by appending "_cover". For more information, see:
         # https://developers.home-assistant.io/docs/entity_registry_index/#unique-id-requirements
         # Note: This is NOT used to generate the user visible Entity ID used in automations.
-        self._attr_unique_id = f"{self._meter_id}_energy"
+        self._attr_unique_id = f"{self._meter_id}_{quantity.key}"
 
         # This is the name for this *entity*, the "name" attribute from "device_info"
         # is used as the device name for device screens in the UI. This name is used on
@@ -150,26 +270,88 @@ class EnergiinfoHistorySensor(PollUpdateMixin, HistoricalSensor, SensorEntity):
         self._attr_has_entity_name = True
         self._attr_name = f"{self._meter_alias}"
         self._attr_entity_id = f"sensor.{DOMAIN}_{self._meter_id}"
+        if quantity.name is not None:
+            self._attr_name = f"{self._meter_alias} {quantity.name}"
+            self._attr_entity_id = f"sensor.{DOMAIN}_{self._meter_id}_{quantity.key}"
 
         self._attr_entity_registry_enabled_default = True
         self._attr_state = None
 
-    # async def async_added_to_hass(self) -> None:
-    #     """Run when this Entity has been added to HA."""
-    #     # Importantly for a push integration, the module that will be getting updates
-    #     # needs to notify HA of changes. The dummy device has a registercallback
-    #     # method, so to this we add the 'self.async_write_ha_state' method, to be
-    #     # called where ever there are changes.
-    #     # The call back registration is done once this entity is registered with HA
-    #     # (rather than in the __init__)
-    #     _LOGGER.info(f"Added {self._attr_name}:{self._attr_unique_id}")
-    #     self._energiinfo_client.register_callback(self.async_write_ha_state)
-
-    # async def async_will_remove_from_hass(self) -> None:
-    #     """Entity being removed from hass."""
-    #     # The opposite of async_added_to_hass. Remove any registered call backs here.
-    #     _LOGGER.info(f"Removed {self._attr_name}:{self._attr_unique_id}")
-    #     self._roller.remove_callback(self.async_write_ha_state)
+    async def async_added_to_hass(self) -> None:
+        """Register the meter with the account coordinator."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_register_meter(
+                self._meter_id,
+                self._async_next_request,
+                self._quantity.signal,
+                self._async_start_backfill,
+            )
+        )
+        # The recorder is asked in the background so it does not hold up setup
+        self.async_on_remove(
+            self.hass.async_create_background_task(
+                self._async_resume_from_recorder(),
+                f"{DOMAIN} resume {self._series_id}",
+            ).cancel
+        )
+
+    async def _async_resume_from_recorder(self) -> None:
+        """Trust the statistics in the recorder if they are newer than the index.
+
+        After a restore or reinstall the stored index may be behind or gone
+        while the recorder still has the statistics, the hours after the index
+        up to the latest of them are not fetched again. Holes in the index stay.
+        """
+        try:
+            latest = await get_last_statistics_wrapper(self.hass, self.statistic_id)
+        finally:
+            self._resumed = True
+        # The statistic starting at an hour holds the value labelled with its end
+        latest_hour = int(latest["start"]) // 3600 + 1 if latest is not None else None
+        last = self._covered.last
+        if latest_hour is not None and (last is None or last < latest_hour):
+            _LOGGER.info(
+                f"Resuming {self._series_id} from the recorder at "
+                f"{hour_to_datetime(latest_hour)}, stored index ends at "
+                f"{self.last_update}"
+            )
+            start = last + 1 if last is not None else self._first_hour()
+            self._covered.add(min(start, latest_hour), latest_hour + 1)
+            self._async_save_covered()
+
+        # Sensors added together are fetched in the same (debounced) cycle.
+        # During startup the coordinator runs the first cycle once started
+        if self.hass.is_running:
+            await self.coordinator.async_request_refresh()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Import the values the coordinator fetched for this meter."""
+        self.hass.async_create_task(self._async_historical_handle_update())
+
+    async def _async_historical_handle_update(self) -> None:
+        started = time.monotonic()
+        profiler: UpdateProfiler | None = self.hass.data[DOMAIN].get(DATA_PROFILER)
+        async with self._statistics_lock:
+            with profiler.profile() if profiler is not None else nullcontext():
+                await self.async_update_historical()
+            with self._trace_phase("write"):
+                await self.async_write_ha_historical_states()
+        self._metrics.statistics_seconds = time.monotonic() - started
+
+    def _trace_phase(self, name: str) -> AbstractContextManager:
+        """Time a phase of this series in the trace of the latest poll cycle."""
+        if (trace := self.coordinator.traces.latest) is None:
+            return nullcontext()
+        return trace.phase(name, self._series_id)
+
+    @property
+    def _metrics(self) -> SeriesMetrics:
+        """Return the metrics of this series in the coordinator."""
+        return self.coordinator.series_metrics.setdefault(
+            self._series_id, SeriesMetrics()
+        )
 
     # This property is important to let HA know if this entity is online or not.
     # If an entity is offline (return False), the UI will refelect this.
@@ -196,159 +378,435 @@ class EnergiinfoHistorySensor(PollUpdateMixin, HistoricalSensor, SensorEntity):
     @property
     def extra_state_attributes(self) -> dict[str, str]:
         """Return the state attributes."""
+        job = self.coordinator.backfills.get(self._series_id)
         return {
             "meter_alias": self._meter_alias,
             "meter_id": self._meter_id,
+            "signal": self._quantity.signal,
             "days_back": self._days_back,
-            "last_update": self._last_update,
+            "last_update": self.last_update,
+            "backfill": job.as_dict() if job is not None else None,
         }
 
-    async def verifyToken(self):
-        # First retrieve the stored token
-        token = await self.hass.async_add_executor_job(
-            self._energiinfo_client.get_access_token
+    @property
+    def last_update(self) -> datetime | None:
+        """Return the newest imported hour."""
+        last = self._covered.last
+        return hour_to_datetime(last) if last is not None else None
+
+    def _first_hour(self) -> int:
+        """Return the first hour to import, days_back ago."""
+        return hour_of(dtutil.now() - timedelta(days=self._days_back))
+
+    def _coarse_resolutions(self) -> list[tuple[str, datetime]]:
+        """Return until when whole months and days are imported as one value."""
+        if not self._quantity.has_sum or self._hourly_days >= self._days_back:
+            return []
+        now = dtutil.now()
+        return [
+            ("month", now - timedelta(days=max(MONTHLY_AFTER_DAYS, self._hourly_days))),
+            ("day", now - timedelta(days=self._hourly_days)),
+        ]
+
+    @callback
+    def _async_next_request(self) -> MeterRequest:
+        """Return the ranges the coordinator should fetch in the next cycle."""
+        if not self._resumed:
+            return MeterRequest(ranges=[])
+        # Every completed hour from days_back ago until now that was not
+        # imported yet, close gaps are fetched as one range. History older
+        # than hourly_days is fetched as day and month values instead
+        current_hour = hour_of(dtutil.now())
+        known = HourIntervals([*self._covered, *self._coarse])
+        gaps = known.missing(self._first_hour(), current_hour + 1)
+        self._metrics.hours_remaining = sum(end - start for start, end in gaps)
+        hourly = []
+        coarse = []
+        for start, end in gaps:
+            for range_start, range_end, interval in split_resolution(
+                hour_to_datetime(start),
+                hour_to_datetime(end),
+                self._coarse_resolutions(),
+            ):
+                if interval == "hour":
+                    hourly.append((range_start, range_end - timedelta(hours=1)))
+                else:
+                    coarse.append((range_start, range_end, interval))
+
+        last = self._covered.last
+        caught_up = last is not None and last > current_hour - 24
+        return MeterRequest(
+            ranges=merge_ranges(hourly, MAX_MERGED_GAP),
+            caught_up=caught_up,
+            coarse=coarse,
+            recheck=self._recheck_ranges() if caught_up else [],
         )
-        # Then authenticate token
-        await self.hass.async_add_executor_job(
-            self._energiinfo_client.authenticateToken, token
+
+    def _correction_start(self) -> int:
+        """Return the first hour of the window checked for corrected values.
+
+        The window starts with the first hour of a local day, so the first day
+        is fingerprinted and fetched whole like every other day.
+        """
+        start = max(self._first_hour(), hour_of(dtutil.now() - CORRECTION_WINDOW))
+        return hour_of(dtutil.start_of_local_day(hour_to_datetime(start - 1))) + 1
+
+    def _recheck_ranges(self) -> list[tuple[datetime, datetime]]:
+        """Return the imported hours to fetch again, once per check interval."""
+        if (
+            self._last_recheck is not None
+            and dtutil.utcnow() - self._last_recheck < CORRECTION_CHECK_INTERVAL
+        ):
+            return []
+        start, last = self._correction_start(), self._covered.last
+        if last is None or start > last:
+            return []
+        return [(hour_to_datetime(start), hour_to_datetime(last))]
+
+    @callback
+    def _async_start_backfill(self, start: datetime, end: datetime) -> BackfillJob:
+        """Start re-importing the hours from start until end in the background."""
+        end = min(end, dtutil.now())
+        # Hours imported as day or month values stay as they are
+        job = BackfillJob(
+            start,
+            end,
+            self._coarse.missing(hour_of(start) + 1, hour_of(end) + 1),
         )
-        status = await self.hass.async_add_executor_job(
-            self._energiinfo_client.getStatus
+        job.task = self.hass.async_create_background_task(
+            self._async_run_backfill(job), f"{DOMAIN} backfill {self._series_id}"
         )
-        # Check if token was verified successfully othersize
-        if status == "OK":
-            _LOGGER.debug("Token successfully verified")
-        else:  # Otherwise handle errors
-            errorMessage = await self.hass.async_add_executor_job(
-                self._energiinfo_client.getErrorMessage
-            )
-            # If access was denied, re-authenticate
-            if errorMessage == "Access denied":
-                _LOGGER.info("Access denied. Will try login again")
-                self.__token = await self.hass.async_add_executor_job(
-                    self._energiinfo_client.authenticate,
-                    self._username,
-                    self._password,
-                    "permanent",
+        self.async_write_ha_state()
+        return job
+
+    async def _async_run_backfill(self, job: BackfillJob) -> None:
+        """Fetch and re-import the ranges of a job, a few periods at a time."""
+        chunks = [
+            chunk
+            for start, end in job.ranges
+            for chunk in split_range(hour_to_datetime(start), hour_to_datetime(end - 1))
+        ]
+        _LOGGER.info(
+            f"Backfilling {job.hours_total} hours of {self._series_id} "
+            f"in {len(chunks)} periods"
+        )
+        try:
+            for offset in range(0, len(chunks), BACKFILL_JOB_PARALLELISM):
+                window = chunks[offset : offset + BACKFILL_JOB_PARALLELISM]
+                fetched = await self.coordinator.async_fetch_history(
+                    self._meter_id, self._quantity.signal, window
                 )
-                user_input = {CONF_STORED_TOKEN: token}
-                # Update token
-                user_input = {**self.config_entry.data, **user_input}
-                self.hass.config_entries.async_update_entry(
-                    self.config_entry, data=user_input
+                series = HourlySeries.from_rows(fetched.values)
+                # Poll cycles update the same statistics, index and rollups
+                async with self._statistics_lock:
+                    await async_replace_statistics(
+                        self.hass, self.get_statistic_metadata(), series
+                    )
+                    await self._async_replace_cost(series)
+                    self._covered.add_hours(series.hours)
+                    await self._async_rebuild_rollups(series)
+                self._async_save_covered()
+                if fetched.error is not None:
+                    raise fetched.error
+                job.hours_done += sum(
+                    hour_of(end) - hour_of(start) + 1 for start, end in window
                 )
-                _LOGGER.debug(f"Updated {CONF_STORED_TOKEN} to {token}")
-            else:
-                _LOGGER.error(f"Status: {status} Error: {errorMessage}")
+                self.async_write_ha_state()
+        except asyncio.CancelledError:
+            job.status = STATUS_CANCELLED
+            self.async_write_ha_state()
+            raise
+        except EnergiinfoError as err:
+            _LOGGER.warning(
+                f"Backfill of {self._series_id} failed: {err.error_message}"
+            )
+            job.status = STATUS_FAILED
+            job.error = err.error_message
+        else:
+            _LOGGER.info(f"Backfill of {self._series_id} done")
+            job.status = STATUS_DONE
+        self.async_write_ha_state()
 
     async def async_update_historical(self):
         # Fill `HistoricalSensor._attr_historical_states` with HistoricalState's
         # This functions is equivaled to the `Sensor.async_update` from
         # HomeAssistant core
         #
-        # Important: You must provide datetime with tzinfo
-        # Timezone info of your timezone aware variable
-        # Create a datetime object with timezone information
-        current_time = self._timzeone.localize(datetime.now())
-        previous_day = current_time - timedelta(days=1)  # Subtract one day
-        self.verifyToken()
-
-        # Initialize days_back to the maximum number of days or 1, depending on last_update
-        if self._last_update is None:
-            days_back_day = min(
-                current_time - timedelta(days=CONF_MAX_DAYS_BACK),
-                current_time - timedelta(days=self._days_back),
+        # The values were fetched by the coordinator for the ranges returned by
+        # `_async_next_request`
+        fetch = (self.coordinator.data or {}).get(self._series_id)
+        self._attr_historical_states = []
+        if fetch is None:
+            return
+
+        if fetch.values is None:
+            _LOGGER.debug(
+                f"No new data found. "
+                f"Status: {fetch.status} Error: {fetch.error_message}"
             )
-        else:
-            days_back_day = min(self._last_update, previous_day)
-            if previous_day < self._last_update:
-                _LOGGER.debug("Update interval changed to 2 Hours")
-                self.UPDATE_INTERVAL = timedelta(hours=2)
-
-        # Calculate the end date for the current iteration
-        end_date = min(
-            days_back_day + timedelta(days=CONF_MAX_DAYS_BACK),
-            previous_day + timedelta(days=1),
-        )
 
-        if self._last_update is not None:
-            if self._last_update < current_time:
-                current_time = self._last_update + timedelta(hours=1)
+        # Hours not imported yet, HistoricalState objects are only built for
+        # the part that goes through HistoricalSensor
+        with self._trace_phase("parse"):
+            series = HourlySeries.from_rows(
+                fetch.values or [],
+                lambda hour: hour in self._covered or hour in self._coarse,
+            )
+        imported = series
+        _LOGGER.debug(f"Fetched {len(series)} new hours for {self._series_id}")
 
-        previous_day = current_time - timedelta(days=1)  # Subtract one day
+        # Day and month values are older than any hourly value, they are
+        # imported as one statistic at the start of their day or month. The
+        # coordinator hands out the same data again after a failed cycle,
+        # periods imported already are skipped like the hours
+        coarse_values = [
+            (coarse.interval, start, float(data["value"]))
+            for coarse in fetch.coarse
+            for data in coarse.values or []
+            if coarse.start
+            <= (start := period_start(data["time"], coarse.interval))
+            < coarse.end
+            and hour_of(start) not in self._coarse
+        ]
+        coarse_states = [
+            HistoricalState(state=value, dt=start + timedelta(hours=1))
+            for _, start, value in coarse_values
+        ]
+        # Statistics for everything not written through HistoricalSensor
+        with self._trace_phase("statistics"):
+            if coarse_states:
+                # Returns once imported, the hourly values continue from the
+                # sum of the last of them
+                await async_fill_statistics(
+                    self.hass, self.get_statistic_metadata(), coarse_states
+                )
 
-        self.config_entry = self.hass.config_entries.async_get_entry(
-            self.registry_entry.config_entry_id
+            # HistoricalSensor only imports after the latest statistic, holes before
+            # it are imported directly
+            latest = await get_last_statistics_wrapper(self.hass, self.statistic_id)
+            if latest is not None:
+                # The hour number of the label of the latest statistic
+                older, series = series.split(int(latest["start"]) // 3600 + 1)
+                if await async_fill_statistics(
+                    self.hass,
+                    self.get_statistic_metadata(),
+                    older.historical_states(),
+                ):
+                    # Filled holes raised the sum of the latest statistic
+                    latest = await get_last_statistics_wrapper(
+                        self.hass, self.statistic_id
+                    )
+
+            # Backfills skip the per state writes of HistoricalSensor, only the
+            # newest hours go through it so the sensor state follows
+            if len(series) > BULK_IMPORT_THRESHOLD:
+                await async_bulk_import(
+                    self.hass,
+                    self.get_statistic_metadata(),
+                    series[:-BULK_IMPORT_TAIL],
+                    (latest or {}).get("sum") or 0.0,
+                )
+                series = series[-BULK_IMPORT_TAIL:]
+
+        if fetch.recheck is not None:
+            self._last_recheck = dtutil.utcnow()
+            with self._trace_phase("corrections"):
+                await self._async_import_corrections(
+                    HourlySeries.from_rows(
+                        fetch.recheck,
+                        lambda hour: hour not in self._covered or hour in self._coarse,
+                    )
+                )
+
+        with self._trace_phase("persist"):
+            if self._rollups is not None and (imported or coarse_values):
+                self._rollups.add(imported)
+                for interval, start, value in coarse_values:
+                    self._rollups.add_period(start, interval, value)
+                self._async_rollups_updated()
+            self._async_mark_covered(fetch, imported)
+
+        with self._trace_phase("cost"):
+            await self._async_update_cost()
+
+        # Fill the historical_states attribute with HistoricalState objects
+        self._attr_historical_states = series.historical_states()
+
+    async def _async_import_corrections(self, series: HourlySeries) -> None:
+        """Import the days of imported hours fetched again whose values changed.
+
+        Only the changed days are imported again, the sums of the statistics
+        after them are adjusted by the difference.
+        """
+        changed = self._fingerprints.update(series)
+        for day, part in iter_days(series):
+            if day not in changed:
+                continue
+            _LOGGER.info(f"Values of {self._series_id} on {day} were corrected")
+            await async_replace_statistics(
+                self.hass, self.get_statistic_metadata(), part
+            )
+            await self._async_replace_cost(part)
+            await self._async_rebuild_rollups(part)
+        self._fingerprints.prune(day_of(self._correction_start()))
+        self._async_save_covered()
+
+    def _cost_metadata(self) -> StatisticMetaData:
+        """Return the metadata of the cost statistic next to the energy one."""
+        return StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"{self._meter_alias} cost",
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{slugify(self._meter_id)}_cost",
+            unit_of_measurement=self._prices.currency,
         )
 
-        hist_states = []
-        period = (
-            (days_back_day + timedelta(hours=1)).strftime("%Y%m%d%H")
-            + "-"
-            + end_date.strftime("%Y%m%d%H")
+    async def _async_update_cost(self) -> None:
+        """Import the cost of imported hours that have no cost statistic yet.
+
+        The energy of those hours is read from the reading cache and joined with
+        the prices of the whole stretch in one pass. Like the energy, cost after
+        the latest cost statistic is imported in bulk and holes before it are
+        filled.
+        """
+        if self._prices is None:
+            return
+        gaps = [
+            gap
+            for start, end in self._covered
+            for gap in self._cost_covered.missing(start, end)
+        ]
+        if not gaps:
+            return
+        first, last = gaps[0][0], gaps[-1][1] - 1
+        rows = await self.coordinator.async_get_cached(
+            self._series_id, hour_to_datetime(first), hour_to_datetime(last)
         )
-        _LOGGER.info(f"Updating historical data between {period}")
-
-        # Fetch input data
-        input_data = await self.hass.async_add_executor_job(
-            self._energiinfo_client.get_period_values,
-            self._meter_id,
-            period,
-            "ActiveEnergy",
-            "hour",
+        energy = HourlySeries.from_rows(
+            rows,
+            lambda hour: hour in self._cost_covered or hour not in self._covered,
         )
-        last_update_changed = False
+        cost = cost_series(energy, await self._prices.async_get_prices(first, last))
 
-        if input_data is None:
-            _LOGGER.debug("No new data found")
-            status = await self.hass.async_add_executor_job(
-                self._energiinfo_client.getStatus
-            )
-            errorMessage = await self.hass.async_add_executor_job(
-                self._energiinfo_client.getErrorMessage
+        metadata = self._cost_metadata()
+        latest = await get_last_statistics_wrapper(
+            self.hass, metadata["statistic_id"]
+        )
+        newer = cost
+        if latest is not None:
+            older, newer = cost.split(int(latest["start"]) // 3600 + 1)
+            if await async_fill_statistics(
+                self.hass, metadata, older.historical_states()
+            ):
+                # Filled holes raised the sum of the latest cost statistic
+                latest = await get_last_statistics_wrapper(
+                    self.hass, metadata["statistic_id"]
+                )
+        if len(newer):
+            await async_bulk_import(
+                self.hass, metadata, newer, (latest or {}).get("sum") or 0.0
             )
 
-            self._attr_historical_states = []
-        elif len(input_data) == 0:
-            status = await self.hass.async_add_executor_job(
-                self._energiinfo_client.getStatus
-            )
-            if status == "OK":
-                last_update_changed = True
-                self._last_update = end_date
-                self._attr_historical_states = []
-        else:
-            # Convert input data into HistoricalState objects
-            for data in input_data:
-                hist_time = dtutil.as_local(datetime.strptime(data["time"], "%Y%m%d%H"))
-                # Check if the current data's time is higher than the highest_time
-                if self._last_update is None or hist_time > self._last_update:
-                    hist = HistoricalState(
-                        state=float(data["value"]),
-                        dt=hist_time,
-                    )
-                    hist_states.append(hist)
-                    _LOGGER.debug(f"Added HistoricalState({hist.state},{hist.dt})")
-                    # Check if the current data's time is higher than the highest_time
-                    if self._last_update is None:
-                        self._last_update = hist.dt
-                        last_update_changed = True
-                    elif hist.dt > self._last_update:
-                        self._last_update = hist.dt
-                        last_update_changed = True
-
-        if last_update_changed:
-            self._last_update = self._last_update - timedelta(hours=1)
-            user_input = {"last_update": self._last_update}
-            # Update with last_update
-            user_input = {**self.config_entry.data, **user_input}
-            self.hass.config_entries.async_update_entry(
-                self.config_entry, data=user_input
+        # Hours without a price are tried again for LATE_DATA_WINDOW, like
+        # hours missing from the API
+        self._cost_covered.add_hours(cost.hours)
+        settled = hour_of(dtutil.now() - LATE_DATA_WINDOW)
+        for start, end in gaps:
+            self._cost_covered.add(start, min(end, settled))
+        self._async_save_covered()
+
+    async def _async_replace_cost(self, energy: HourlySeries) -> None:
+        """Import the cost of re-imported energy over its cost statistics."""
+        if self._prices is None or not len(energy):
+            return
+        prices = await self._prices.async_get_prices(
+            energy.hours[0], energy.hours[-1]
+        )
+        cost = cost_series(energy, prices)
+        await async_replace_statistics(self.hass, self._cost_metadata(), cost)
+        self._cost_covered.add_hours(cost.hours)
+
+    async def _async_rebuild_rollups(self, series: HourlySeries) -> None:
+        """Rebuild the rollups of the months of re-imported hours from the cache."""
+        if self._rollups is None or not len(series):
+            return
+        first = hour_to_datetime(series.hours[0] - 1).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        last = hour_to_datetime(series.hours[-1] - 1).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        end = (last + timedelta(days=32)).replace(day=1)
+        rows = await self.coordinator.async_get_cached(
+            self._series_id, first + timedelta(hours=1), end
+        )
+        # Cached hours not imported yet are added to the rollups when they are
+        self._rollups.replace_months(
+            HourlySeries.from_rows(
+                rows, lambda hour: hour in self._coarse or hour not in self._covered
             )
-            _LOGGER.info(f"Updated last_update to {self._last_update}")
+        )
+        self._async_rollups_updated()
 
-        # Fill the historical_states attribute with HistoricalState objects
-        self._attr_historical_states = hist_states
+    @callback
+    def _async_rollups_updated(self) -> None:
+        """Store the rollups and tell the rollup sensors."""
+        self._async_save_covered()
+        async_dispatcher_send(
+            self.hass, SIGNAL_ROLLUPS_UPDATED.format(self._series_id)
+        )
+
+    @callback
+    def _async_mark_covered(self, fetch: MeterFetch, imported: HourlySeries) -> None:
+        """Record the imported hours and the fetched ranges that are settled."""
+        before = (self._covered.as_list(), self._coarse.as_list())
+        self._covered.add_hours(imported.hours)
+        # Hours imported before the correction window are never checked again
+        self._fingerprints.add(imported.split(self._correction_start() - 1)[1])
+        for coarse in fetch.coarse:
+            if coarse.values is not None:
+                self._coarse.add(hour_of(coarse.start), hour_of(coarse.end))
+
+        # Hours the API did not return close to the newest value may still be
+        # published, older ones are not asked for again
+        settled = None
+        if (last := self._covered.last) is not None:
+            settled = last - int(LATE_DATA_WINDOW.total_seconds()) // 3600
+        elif fetch.status == "OK" and not fetch.values and fetch.ranges:
+            # A series that never returned a value is settled up to the end of
+            # the request, or it would ask for all of days_back every cycle
+            settled = max(hour_of(end) for _, end in fetch.ranges)
+        if settled is not None:
+            if fetch.failed_at is not None:
+                settled = min(settled, hour_of(fetch.failed_at) - 1)
+            for start, end in fetch.ranges:
+                self._covered.add(hour_of(start), min(hour_of(end), settled) + 1)
+
+        if (self._covered.as_list(), self._coarse.as_list()) == before:
+            return
+        self._async_save_covered()
+
+    @callback
+    def _async_save_covered(self) -> None:
+        """Store the interval indexes, fingerprints and last_update of the series."""
+        # Saved with a delay, together with the other meters of this cycle
+        self.coordinator.sync_store.async_update_meter(
+            self._series_id,
+            **{
+                CONF_COVERED: self._covered.as_list(),
+                CONF_COARSE: self._coarse.as_list(),
+                CONF_FINGERPRINTS: self._fingerprints.as_dict(),
+                CONF_COST_COVERED: self._cost_covered.as_list(),
+                CONF_ROLLUPS: self._rollups.as_dict()
+                if self._rollups is not None
+                else None,
+                CONF_LAST_UPDATE: self.last_update.isoformat()
+                if self.last_update is not None
+                else None,
+            },
+        )
+        _LOGGER.info(f"Updated last_update to {self.last_update}")
 
     async def async_calculate_statistic_data(
         self, hist_states: list[HistoricalState], *, latest: dict | None = None
@@ -357,29 +815,23 @@ class EnergiinfoHistorySensor(PollUpdateMixin, HistoricalSensor, SensorEntity):
         # Group historical states by hour
         # Calculate sum, mean, etc...
         #
+        if not self._quantity.has_sum:
+            return list(
+                itertools.chain.from_iterable(iter_mean_statistic_data(hist_states))
+            )
+
         accumulated = latest["sum"] if latest else 0
         _LOGGER.info(
-            f"Will calculate statistics data for historical states: accumulated{accumulated}"
+            f"Will calculate statistics data for {len(hist_states)} historical states: "
+            f"accumulated={accumulated}"
         )
 
-        ret = []
-        for hist in hist_states:
-            mean = hist.state
-            partial_sum = hist.state
-            accumulated = accumulated + partial_sum
-            _LOGGER.debug(
-                f"StatisticData: datetime={hist.dt},state=hist.state,mean=mean,sum=accumulated"
-            )
-            if hist.dt.minute == 0 and hist.dt.second == 0:
-                hist.dt = hist.dt - timedelta(hours=1)
-            ret.append(
-                StatisticData(
-                    start=hist.dt,
-                    state=partial_sum,
-                    mean=mean,
-                    sum=accumulated,
-                )
+        # The running sum is computed in one pass, see iter_statistic_data
+        ret = list(
+            itertools.chain.from_iterable(
+                iter_statistic_data(hist_states, accumulated)
             )
+        )
         _LOGGER.info(f"Finished calculating statistics data")
 
         return ret
@@ -391,6 +843,236 @@ class EnergiinfoHistorySensor(PollUpdateMixin, HistoricalSensor, SensorEntity):
         # internal source by default.
         #
         meta = super().get_statistic_metadata()
-        meta["has_sum"] = True
-        # meta["has_mean"] = True
+        meta["has_sum"] = self._quantity.has_sum
+        meta["has_mean"] = not self._quantity.has_sum
         return meta
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+@dataclass(frozen=True, kw_only=True)
+class EnergiinfoDiagnosticDescription(SensorEntityDescription):
+    """Describes a diagnostic sensor of an account or a meter.
+
+    value_fn gets the coordinator and the entry id (account) or meter id.
+    """
+
+    value_fn: Callable[[EnergiinfoCoordinator, str], StateType | datetime]
+
+
+ACCOUNT_DIAGNOSTICS: tuple[EnergiinfoDiagnosticDescription, ...] = (
+    EnergiinfoDiagnosticDescription(
+        key="api_latency",
+        name="API latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, _: _milliseconds(
+            coordinator.metrics.last_latency
+        ),
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="api_calls_per_hour",
+        name="API calls per hour",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, _: coordinator.metrics.calls_last_hour,
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="consecutive_failures",
+        name="Consecutive API failures",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, _: coordinator.metrics.consecutive_failures,
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="update_interval",
+        name="Update interval",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda coordinator, _: coordinator.update_interval.total_seconds()
+        if coordinator.update_interval
+        else None,
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="token_refreshed",
+        name="Last token refresh",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator, _: coordinator.tokens.refreshed,
+    ),
+)
+
+METER_DIAGNOSTICS: tuple[EnergiinfoDiagnosticDescription, ...] = (
+    EnergiinfoDiagnosticDescription(
+        key="rows_fetched",
+        name="Rows fetched",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, meter_id: coordinator.series_metrics.get(
+            meter_id, SeriesMetrics()
+        ).rows_fetched,
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="fetch_duration",
+        name="Fetch duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, meter_id: _milliseconds(
+            coordinator.series_metrics.get(meter_id, SeriesMetrics()).fetch_seconds
+        ),
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="statistics_duration",
+        name="Statistics duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, meter_id: _milliseconds(
+            coordinator.series_metrics.get(
+                meter_id, SeriesMetrics()
+            ).statistics_seconds
+        ),
+    ),
+    EnergiinfoDiagnosticDescription(
+        key="backfill_remaining",
+        name="Backfill hours remaining",
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator, meter_id: coordinator.series_metrics.get(
+            meter_id, SeriesMetrics()
+        ).hours_remaining,
+    ),
+)
+
+
+class EnergiinfoDiagnosticSensor(
+    CoordinatorEntity[EnergiinfoCoordinator], SensorEntity
+):
+    """Sync health of an account or a meter, updated with every poll cycle."""
+
+    entity_description: EnergiinfoDiagnosticDescription
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: EnergiinfoCoordinator,
+        description: EnergiinfoDiagnosticDescription,
+        key: str,
+        name: str,
+    ) -> None:
+        """Initialize the sensor for an entry id or meter id."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._key = key
+        self._attr_unique_id = f"{key}_{description.key}"
+        self._attr_name = f"{name} {description.name}"
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the current value from the coordinator."""
+        return self.entity_description.value_fn(self.coordinator, self._key)
+
+
+@dataclass(frozen=True, kw_only=True)
+class EnergiinfoRollupDescription(SensorEntityDescription):
+    """Describes a sensor reading the rollups of a meter.
+
+    value_fn and attributes_fn get the rollups and the current local month.
+    """
+
+    value_fn: Callable[[Rollups, str], StateType]
+    attributes_fn: Callable[[Rollups, str], dict]
+
+
+def _peak_average(rollups: Rollups, month: str) -> float | None:
+    peaks = rollups.peaks.get(month)
+    return round(statistics.fmean(value for _, value in peaks), 3) if peaks else None
+
+
+ROLLUP_SENSORS: tuple[EnergiinfoRollupDescription, ...] = (
+    EnergiinfoRollupDescription(
+        key="day_energy",
+        name="Energy last day",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda rollups, _: rollups.daily[max(rollups.daily)]
+        if rollups.daily
+        else None,
+        attributes_fn=lambda rollups, _: {
+            "day": max(rollups.daily, default=None),
+            "days": latest(rollups.daily, ROLLUP_ATTRIBUTE_DAYS),
+        },
+    ),
+    EnergiinfoRollupDescription(
+        key="month_energy",
+        name="Energy this month",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda rollups, month: rollups.monthly.get(month),
+        attributes_fn=lambda rollups, _: {
+            "months": latest(rollups.monthly, ROLLUP_ATTRIBUTE_MONTHS),
+        },
+    ),
+    EnergiinfoRollupDescription(
+        key="peak_hours",
+        name="Peak hours average",
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=_peak_average,
+        attributes_fn=lambda rollups, month: {
+            "peaks": [
+                {"start": hour_to_datetime(int(hour) - 1).isoformat(), "value": value}
+                for hour, value in rollups.peaks.get(month, [])
+            ],
+        },
+    ),
+)
+
+
+class EnergiinfoRollupSensor(SensorEntity):
+    """Totals and peak hours of a meter, updated when its energy is imported."""
+
+    entity_description: EnergiinfoRollupDescription
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        rollups: Rollups,
+        description: EnergiinfoRollupDescription,
+        meter_id: str,
+        meter_alias: str,
+    ) -> None:
+        """Initialize the sensor for the rollups of a meter."""
+        self.entity_description = description
+        self._rollups = rollups
+        self._series_id = series_id(meter_id)
+        self._attr_unique_id = f"{meter_id}_{description.key}"
+        self._attr_name = f"{meter_alias} {description.name}"
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the updates of the rollups."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_ROLLUPS_UPDATED.format(self._series_id),
+                self.async_write_ha_state,
+            )
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value from the rollups."""
+        return self.entity_description.value_fn(
+            self._rollups, dtutil.now().strftime("%Y%m")
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the totals and peak hours behind the value."""
+        return self.entity_description.attributes_fn(
+            self._rollups, dtutil.now().strftime("%Y%m")
+        )
@@ -0,0 +1,60 @@
+"""Compact hourly series for the energiinfo integration."""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+from collections.abc import Callable, Iterable
+
+from homeassistant_historical_sensor import HistoricalState
+
+from .intervals import hour_to_datetime, hours_of_times
+
+
+class HourlySeries:
+    """Hourly values in two flat arrays instead of one object per hour.
+
+    `hours` holds the hour numbers of the `YYYYMMDDHH` labels, which is the end
+    of the hour a value is for, in ascending order. HistoricalState and
+    StatisticData objects are only built where the recorder needs them.
+    """
+
+    __slots__ = ("hours", "values")
+
+    def __init__(self, hours: Iterable[int] = (), values: Iterable[float] = ()) -> None:
+        """Initialize the series from hour numbers and values."""
+        self.hours = array("q", hours)
+        self.values = array("d", values)
+
+    @classmethod
+    def from_rows(
+        cls, rows: list[dict], skip: Callable[[int], bool] | None = None
+    ) -> HourlySeries:
+        """Return the series of API rows, without the hours skip returns True for."""
+        series = cls()
+        for hour, row in zip(hours_of_times(row["time"] for row in rows), rows):
+            if skip is None or not skip(hour):
+                series.hours.append(hour)
+                series.values.append(float(row["value"]))
+        return series
+
+    def __len__(self) -> int:
+        return len(self.hours)
+
+    def __getitem__(self, index: slice) -> HourlySeries:
+        series = HourlySeries()
+        series.hours = self.hours[index]
+        series.values = self.values[index]
+        return series
+
+    def split(self, hour: int) -> tuple[HourlySeries, HourlySeries]:
+        """Return the parts up to and including hour, and after it."""
+        index = bisect.bisect_right(self.hours, hour)
+        return self[:index], self[index:]
+
+    def historical_states(self) -> list[HistoricalState]:
+        """Return the series as HistoricalState objects."""
+        return [
+            HistoricalState(state=value, dt=hour_to_datetime(hour))
+            for hour, value in zip(self.hours, self.values)
+        ]
@@ -0,0 +1,110 @@
+"""Services of the energiinfo integration."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dtutil
+
+from .const import DOMAIN, DATA_ACCOUNTS, DATA_PROFILER, CONF_METERID
+from .coordinator import EnergiinfoCoordinator, series_id
+from .quantities import ENERGY, QUANTITIES
+from .trace import UpdateProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROFILE = "profile"
+SERVICE_BACKFILL = "backfill"
+SERVICE_CANCEL_BACKFILL = "cancel_backfill"
+ATTR_RUNS = "runs"
+ATTR_QUANTITY = "quantity"
+ATTR_START = "start"
+ATTR_END = "end"
+
+PROFILE_SCHEMA = vol.Schema({vol.Optional(ATTR_RUNS, default=5): cv.positive_int})
+SERIES_SCHEMA = {
+    vol.Required(CONF_METERID): cv.string,
+    vol.Optional(ATTR_QUANTITY, default=ENERGY): vol.In(QUANTITIES),
+}
+BACKFILL_SCHEMA = vol.Schema(
+    {
+        **SERIES_SCHEMA,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+CANCEL_BACKFILL_SCHEMA = vol.Schema(SERIES_SCHEMA)
+
+
+def _local(value: datetime) -> datetime:
+    """Return a service datetime in local time, naive ones are local already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dtutil.DEFAULT_TIME_ZONE)
+    return dtutil.as_local(value)
+
+
+@callback
+def _async_find_series(
+    hass: HomeAssistant, call: ServiceCall
+) -> tuple[EnergiinfoCoordinator, str]:
+    """Return the coordinator and id of the series a call is for."""
+    key = series_id(
+        call.data[CONF_METERID], QUANTITIES[call.data[ATTR_QUANTITY]].signal
+    )
+    accounts = hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {})
+    for coordinator in accounts.values():
+        if coordinator.has_series(key):
+            return coordinator, key
+    raise HomeAssistantError(
+        f"No {call.data[ATTR_QUANTITY]} sensor for meter {call.data[CONF_METERID]}"
+    )
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    @callback
+    def _async_profile(call: ServiceCall) -> None:
+        """Profile the next runs of async_update_historical."""
+        runs = call.data[ATTR_RUNS]
+        hass.data.setdefault(DOMAIN, {})[DATA_PROFILER] = UpdateProfiler(runs)
+        _LOGGER.info(f"Profiling the next {runs} historical updates")
+
+    @callback
+    def _async_backfill(call: ServiceCall) -> None:
+        """Re-import a range of a series as a background job."""
+        coordinator, key = _async_find_series(hass, call)
+        start = _local(call.data[ATTR_START])
+        end = _local(call.data.get(ATTR_END, dtutil.now()))
+        if start >= end:
+            raise HomeAssistantError("The start of a backfill must be before its end")
+        job = coordinator.async_start_backfill(key, start, end)
+        _LOGGER.info(f"Started backfill of {job.hours_total} hours of {key}")
+
+    @callback
+    def _async_cancel_backfill(call: ServiceCall) -> None:
+        """Cancel the running backfill job of a series."""
+        coordinator, key = _async_find_series(hass, call)
+        job = coordinator.backfills.get(key)
+        if job is None or not job.cancel():
+            raise HomeAssistantError(f"No backfill of {key} is running")
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL, _async_backfill, schema=BACKFILL_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CANCEL_BACKFILL,
+        _async_cancel_backfill,
+        schema=CANCEL_BACKFILL_SCHEMA,
+    )
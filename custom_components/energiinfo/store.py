@@ -0,0 +1,83 @@
+"""Persisted sync state of the energiinfo integration."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, DATA_SYNC_STORE
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.sync"
+# Changes within this many seconds are written to disk together
+SAVE_DELAY = 30
+
+
+async def async_get_sync_store(hass: HomeAssistant) -> EnergiinfoSyncStore:
+    """Return the loaded sync store shared by all config entries."""
+    if (store := hass.data[DOMAIN].get(DATA_SYNC_STORE)) is None:
+        store = hass.data[DOMAIN][DATA_SYNC_STORE] = EnergiinfoSyncStore(hass)
+    await store.async_load()
+    return store
+
+
+class EnergiinfoSyncStore:
+    """Sync state per meter and per account, kept out of the config entries.
+
+    Meters keep the hours that were imported, accounts keep their refreshed
+    token and what the poll scheduler learned. Updates only schedule a save,
+    so a poll cycle updating many meters ends up as one write of
+    `.storage/energiinfo.sync` instead of one rewrite of all config entries
+    per meter.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty store."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._data: dict[str, dict[str, Any]] = {"meters": {}, "accounts": {}}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Load the stored state once."""
+        async with self._lock:
+            if self._loaded:
+                return
+            if (data := await self._store.async_load()) is not None:
+                self._data.update(data)
+            self._loaded = True
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
+
+    def meter(self, meter_id: str) -> dict[str, Any]:
+        """Return the stored state of a meter."""
+        return self._data["meters"].get(meter_id, {})
+
+    @callback
+    def async_update_meter(self, meter_id: str, **changes: Any) -> None:
+        """Update the state of a meter and schedule a save."""
+        self._data["meters"][meter_id] = {**self.meter(meter_id), **changes}
+        self._async_schedule_save()
+
+    @callback
+    def async_remove_meter(self, meter_id: str) -> None:
+        """Forget the state of a meter and schedule a save."""
+        if self._data["meters"].pop(meter_id, None) is not None:
+            self._async_schedule_save()
+
+    def account(self, account_id: str) -> dict[str, Any]:
+        """Return the stored state of an account."""
+        return self._data["accounts"].get(account_id, {})
+
+    @callback
+    def async_update_account(self, account_id: str, **changes: Any) -> None:
+        """Update the state of an account and schedule a save."""
+        self._data["accounts"][account_id] = {**self.account(account_id), **changes}
+        self._async_schedule_save()
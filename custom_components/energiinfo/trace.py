@@ -0,0 +1,109 @@
+"""Poll cycle traces and update profiling for the energiinfo integration."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import cProfile
+from dataclasses import dataclass, field
+from datetime import datetime
+import io
+import logging
+import pstats
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Poll cycles kept per account
+TRACE_BUFFER_SIZE = 50
+# Functions listed in a profile report
+PROFILE_REPORT_LINES = 40
+
+
+@dataclass
+class PollTrace:
+    """Phase timings (ms), payload size and outcome of one poll cycle.
+
+    The coordinator fills the token and fetch phases, every sensor adds the
+    parse, statistics and persist phases of its series.
+    """
+
+    started: datetime
+    phases: dict[str, float] = field(default_factory=dict)
+    payload_bytes: int = 0
+    api_calls: int = 0
+    error: str | None = None
+    series: dict[str, dict] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str, series_id: str | None = None) -> Iterator[None]:
+        """Time a phase of the cycle, or of one series in it."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = round((time.monotonic() - started) * 1000, 1)
+            if series_id is None:
+                self.phases[name] = elapsed
+            else:
+                self.series.setdefault(series_id, {})[f"{name}_ms"] = elapsed
+
+
+class TraceBuffer(deque[PollTrace]):
+    """Ring buffer of the latest poll traces of an account."""
+
+    def __init__(self) -> None:
+        """Initialize an empty buffer of TRACE_BUFFER_SIZE traces."""
+        super().__init__(maxlen=TRACE_BUFFER_SIZE)
+
+    @property
+    def latest(self) -> PollTrace | None:
+        """Return the trace of the latest poll cycle."""
+        return self[-1] if self else None
+
+
+class UpdateProfiler:
+    """Profile a number of runs of async_update_historical.
+
+    cProfile follows the event loop thread, so runs of several sensors that
+    overlap share one profile that is enabled while any of them is running.
+    """
+
+    def __init__(self, runs: int) -> None:
+        """Initialize the profiler for the next runs."""
+        self.remaining = runs
+        self.report: str | None = None
+        self._profile = cProfile.Profile()
+        self._active = 0
+
+    @property
+    def done(self) -> bool:
+        """Return True once all runs were profiled."""
+        return self.remaining <= 0 and self._active == 0
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """Profile one run, the report is built after the last one."""
+        if self.remaining <= 0:
+            yield
+            return
+        self.remaining -= 1
+        if self._active == 0:
+            self._profile.enable()
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self._profile.disable()
+            if self.done and self.report is None:
+                self.report = self._build_report()
+                _LOGGER.info(f"Profile of async_update_historical:\n{self.report}")
+
+    def _build_report(self) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_REPORT_LINES)
+        return output.getvalue()